@@ -0,0 +1,191 @@
+"""
+Serves the dashboard and archive to many simultaneous connections in-process and compares three setups: the WSGI
+handler behind a pool of worker threads (as a threaded WSGI server would), the ASGI handler with the sync views and
+the ASGI handler with the async views. By default 200 connections send 5 requests each, against 32 WSGI threads and
+a temporary SQLite database with 2000 todos.
+
+Reports throughput, percentiles of the time at which responses complete (measured from the moment all
+connections start, so waiting for a free thread counts) and the peak number of threads used.
+
+Run with `python -m benchmarks.bench_async [connections] [requests per connection] [WSGI threads] [number of todos]`.
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todo.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.asgi import get_asgi_application  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+from django.urls import include, path  # noqa: E402
+
+from benchmarks.data import seed, temporary_database  # noqa: E402
+from todoguardian.urls import app_name, get_urlpatterns  # noqa: E402
+
+PATHS = ["/dashboard/", "/archive/"]
+
+
+class AsyncURLConf:
+    urlpatterns = [
+        path("", include((get_urlpatterns(asynchronous=True), app_name))),
+        path("initials-avatar/", include("django_initials_avatar.urls")),
+    ]
+
+
+class ThreadCounter:
+    """Samples the number of live threads in the background, keeping the peak."""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self.running = True
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def sample(self) -> None:
+        while self.running:
+            self.peak = max(self.peak, threading.active_count())
+            time.sleep(0.001)
+
+    def __enter__(self) -> "ThreadCounter":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.running = False
+        self.thread.join()
+
+
+def run_wsgi(connections: int, requests: int, threads: int) -> tuple[list[float], int]:
+    application = get_wsgi_application()
+
+    def request(path: str) -> None:
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path,
+            "QUERY_STRING": "",
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "HTTP_HOST": "localhost",
+            "wsgi.url_scheme": "http",
+            "wsgi.input": BytesIO(),
+            "wsgi.errors": sys.stderr,
+        }
+        statuses = []
+
+        b"".join(application(environ, lambda status, headers: statuses.append(status)))
+        assert statuses[0].startswith("200"), statuses[0]
+
+    # Like a threaded server with keep-alive, a worker thread serves one connection at a time and the others wait
+    def client(index: int) -> list[float]:
+        latencies = []
+        for _ in range(requests):
+            request(PATHS[index % len(PATHS)])
+            latencies.append(time.perf_counter() - start)
+
+        return latencies
+
+    with ThreadCounter() as counter, ThreadPoolExecutor(max_workers=threads) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(client, range(connections)))
+
+    return [latency for latencies in results for latency in latencies], counter.peak
+
+
+def run_asgi(connections: int, requests: int) -> tuple[list[float], int]:
+    application = get_asgi_application()
+
+    async def request(path: str) -> None:
+        sent = False
+        statuses = []
+
+        async def receive() -> dict:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            # Wait for a disconnect that never comes, Django cancels this once the response is sent
+            await asyncio.Future()
+
+        async def send(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"localhost")],
+            "client": ("127.0.0.1", 12345),
+            "server": ("localhost", 80),
+        }
+
+        await application(scope, receive, send)
+        assert statuses[0] == 200, statuses[0]
+
+    async def client(index: int, start: float) -> list[float]:
+        latencies = []
+        for _ in range(requests):
+            await request(PATHS[index % len(PATHS)])
+            latencies.append(time.perf_counter() - start)
+
+        return latencies
+
+    async def main() -> list[float]:
+        start = time.perf_counter()
+        results = await asyncio.gather(*[client(index, start) for index in range(connections)])
+
+        return [latency for latencies in results for latency in latencies]
+
+    with ThreadCounter() as counter:
+        latencies = asyncio.run(main())
+
+    return latencies, counter.peak
+
+
+def report(name: str, latencies: list[float], threads: int) -> None:
+    quantiles = statistics.quantiles(latencies, n=100)
+
+    print(
+        "{name:<16} {requests} requests in {duration:.2f}s ({throughput:.0f} req/s), completed p50 {p50:.3f}s p95 {p95:.3f}s p99 {p99:.3f}s, peak threads {threads}".format(
+            name=name, requests=len(latencies), duration=max(latencies), throughput=len(latencies) / max(latencies), p50=quantiles[49], p95=quantiles[94], p99=quantiles[98], threads=threads
+        )
+    )
+
+
+def main(connections: int = 200, requests: int = 5, threads: int = 32, number: int = 2000) -> None:
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ["localhost"]
+
+    with temporary_database():
+        seed(number)
+        connection.close()
+
+        print("{connections} connections x {requests} requests, {number} todos".format(connections=connections, requests=requests, number=number))
+
+        report("wsgi ({threads} threads)".format(threads=threads), *run_wsgi(connections, requests, threads))
+        report("asgi sync views", *run_asgi(connections, requests))
+
+        with override_settings(ROOT_URLCONF=AsyncURLConf):
+            report("asgi async views", *run_asgi(connections, requests))
+
+
+if __name__ == "__main__":
+    main(*[int(argument) for argument in sys.argv[1:]])
@@ -0,0 +1,114 @@
+"""
+Compares `to_date` with the implementation it replaced (regexes rebuilt per call, dateutil for every absolute
+date and a day by day loop for business days), both with its memoization and without (the speedup column).
+
+Run with `python -m benchmarks.bench_date`.
+"""
+
+import os
+import re
+import time
+from datetime import date, timedelta
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todo.settings")
+django.setup()
+
+from dateutil import parser  # noqa: E402
+from dateutil.relativedelta import relativedelta  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from todoguardian.functions.date import _calculate_date_from_weekday, _to_date, to_date  # noqa: E402
+
+PATTERNS = ["2024-06-07", "5d", "2w", "1m", "1y", "250b", "today", "tomorrow", "friday", "06/07/2024"]
+
+
+def legacy_to_date(pattern: str, offset: date | None = None) -> date | None:
+    if offset is None:
+        offset = timezone.localdate()
+
+    relative_pattern = re.match("(?P<length>-?[0-9]+)(?P<period>[dwmyb])$", pattern, re.I)
+    weekdays = ["mo(n(day)?)?$", "tu(e(sday)?)?$", "we(d(nesday)?)?$", "th(u(rsday)?)?$", "fr(i(day)?)?$", "sa(t(urday)?)?$", "su(n(day)?)?$"]
+    weekday_pattern = re.match("|".join(weekdays), pattern)
+
+    if relative_pattern:
+        return legacy_calculate_date_from_pattern(int(relative_pattern.group("length")), relative_pattern.group("period"), offset)
+    elif weekday_pattern:
+        return _calculate_date_from_weekday(weekday_pattern.group(0))
+    elif re.match("tod(ay)?$", pattern):
+        return legacy_calculate_date_from_pattern(0, "d")
+    elif re.match("tom(orrow)?$", pattern):
+        return legacy_calculate_date_from_pattern(1, "d")
+    elif re.match("yes(terday)?$", pattern):
+        return legacy_calculate_date_from_pattern(-1, "d")
+    else:
+        try:
+            return parser.parse(pattern).date()
+        except parser.ParserError:
+            return None
+
+
+def legacy_calculate_date_from_pattern(length: int, period: str, offset: date | None = None) -> date | None:
+    if offset is None:
+        offset = timezone.localdate()
+
+    match period:
+        case "d":
+            return offset + relativedelta(days=length)
+        case "w":
+            return offset + relativedelta(weeks=length)
+        case "m":
+            return offset + relativedelta(months=length)
+        case "y":
+            return offset + relativedelta(years=length)
+        case "b":
+            result = offset
+            days = length
+            delta = 1 if days > 0 else -1
+
+            while abs(days) > 0:
+                result = result + relativedelta(days=delta)
+                if result.weekday() >= 5:
+                    continue
+
+                days = days - delta
+
+            return result
+
+
+def per_call(function, pattern: str, offsets: list[date]) -> float:
+    """Returns the average duration of a call in microseconds, calling `function` once per offset."""
+    start = time.perf_counter()
+    for offset in offsets:
+        function(pattern, offset)
+
+    return (time.perf_counter() - start) / len(offsets) * 1e6
+
+
+def main(number: int = 2000) -> None:
+    """
+    Reports three figures per pattern: the legacy implementation, `to_date` called with the same arguments every time
+    (served from its memoization after the first call) and the engine behind it, called with a different offset every
+    time after clearing the memoized results, so every call computes the date with the compiled pattern.
+    """
+    today = timezone.localdate()
+    same = [today] * number
+    different = [today + timedelta(days=i) for i in range(number)]
+
+    print("{pattern:<12} {legacy:>12} {memoized:>14} {engine:>12} {speedup:>8}".format(pattern="pattern", legacy="legacy (us)", memoized="memoized (us)", engine="engine (us)", speedup="speedup"))
+
+    for pattern in PATTERNS:
+        assert legacy_to_date(pattern) == to_date(pattern), pattern
+
+        legacy = per_call(legacy_to_date, pattern, different)
+        memoized = per_call(to_date, pattern, same)
+
+        _to_date.cache_clear()
+        engine = per_call(to_date, pattern, different)
+
+        print("{pattern:<12} {legacy:>12.1f} {memoized:>14.1f} {engine:>12.1f} {speedup:>7.1f}x".format(pattern=pattern, legacy=legacy, memoized=memoized, engine=engine, speedup=legacy / engine))
+
+
+if __name__ == "__main__":
+    main()
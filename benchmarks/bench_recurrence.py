@@ -0,0 +1,44 @@
+"""
+Times `forecast_rows` on synthetic recurring todos, by default 50k todos with a one year horizon.
+
+Run with `python -m benchmarks.bench_recurrence [number of todos]`.
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todo.settings")
+django.setup()
+
+from todoguardian.functions.recurrence import forecast_rows  # noqa: E402
+
+RECURRENCES = ["1d", "2d", "1w", "+1w", "2w", "1b", "+5b", "1m", "+1m", "3m", "1y"]
+
+
+def main(number: int = 50000) -> None:
+    today = date(2024, 6, 7)
+    until = today + timedelta(weeks=52)
+
+    random.seed(0)
+    rows = []
+    for id in range(number):
+        due_date = today + timedelta(days=random.randint(-30, 30)) if random.random() < 0.9 else None
+        rows.append((id, random.choice(RECURRENCES), due_date, due_date - timedelta(days=random.randint(0, 3)) if due_date else today))
+
+    weekly = [(id, "1w", due_date, start_date) for id, _, due_date, start_date in rows]
+
+    for name, data in [("mixed", rows), ("weekly", weekly)]:
+        start = time.perf_counter()
+        result = forecast_rows(data, until, today)
+        duration = time.perf_counter() - start
+
+        print("{name:<8} {todos} todos -> {occurrences} occurrences in {duration:.3f}s".format(name=name, todos=len(data), occurrences=len(result), duration=duration))
+
+
+if __name__ == "__main__":
+    main(*[int(argument) for argument in sys.argv[1:]])
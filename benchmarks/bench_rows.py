@@ -0,0 +1,70 @@
+"""
+Compares loading the dashboard's todos as model instances with prefetched projects and contexts (as the list views
+did before) with loading them as `TodoRow` read models through `Todo.objects.rows()`. Both load every open todo of a
+temporary SQLite database with 20000 todos by default, once as a whole and once as a page of `PAGE_SIZE` todos.
+
+Reports the fastest of a number of runs and the peak memory (traced in a separate run, as tracing slows things down).
+
+Run with `python -m benchmarks.bench_rows [number of todos] [runs]`.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todo.settings")
+django.setup()
+
+from django.utils import timezone  # noqa: E402
+
+from benchmarks.data import seed, temporary_database  # noqa: E402
+from todoguardian.functions.pagination import ORDERING, PAGE_SIZE  # noqa: E402
+from todoguardian.models import Todo, TodoQuerySet  # noqa: E402
+
+
+def dashboard_todos() -> TodoQuerySet:
+    return Todo.objects.filter(completion_date=None).exclude(start_date__gt=timezone.localdate()).with_due_date_code().order_by(*ORDERING)
+
+
+def measure(function: Callable[[], list], runs: int) -> tuple[int, float, int]:
+    """Returns the number of todos loaded, the fastest duration and the peak memory in KiB."""
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        todos = function()
+        durations.append(time.perf_counter() - start)
+
+    del todos
+
+    tracemalloc.start()
+    todos = function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return len(todos), min(durations), peak // 1024
+
+
+def main(number: int = 20000, runs: int = 5) -> None:
+    cases = {
+        "models": lambda todos: todos.prefetch_related("projects", "contexts"),
+        "rows": lambda todos: todos.rows(),
+    }
+
+    with temporary_database():
+        seed(number)
+
+        print("{number} todos, fastest of {runs} runs".format(number=number, runs=runs))
+
+        for limit in [None, PAGE_SIZE]:
+            for name, load in cases.items():
+                count, duration, peak = measure(lambda: list(load(dashboard_todos())[:limit]), runs)
+
+                print("{name:<8} {count:>6} todos {duration:8.4f}s peak {peak:>8} KiB".format(name=name, count=count, duration=duration, peak=peak))
+
+
+if __name__ == "__main__":
+    main(*[int(argument) for argument in sys.argv[1:]])
@@ -0,0 +1,59 @@
+"""
+Streams the dashboard with all open todos on a single page (`?all=1`) for growing numbers of todos and reports the
+time to the first chunk, the total time and the peak memory of consuming the response (traced in a separate run, as
+tracing slows things down). Uses a temporary SQLite database per size.
+
+Run with `python -m benchmarks.bench_streaming [number of todos ...]` (default: 1000 5000 20000).
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todo.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from benchmarks.data import seed, temporary_database  # noqa: E402
+
+
+def consume(client: Client) -> tuple[float, float, int]:
+    """Returns the time to the first chunk, the total time and the number of bytes of the streamed dashboard."""
+    start = time.perf_counter()
+    chunks = iter(client.get(reverse("todoguardian:dashboard"), {"all": "1"}).streaming_content)
+
+    size = len(next(chunks))
+    first = time.perf_counter() - start
+    size += sum(len(chunk) for chunk in chunks)
+
+    return first, time.perf_counter() - start, size
+
+
+def main(*numbers: int) -> None:
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ["testserver"]
+
+    for number in numbers or (1000, 5000, 20000):
+        with temporary_database():
+            seed(number)
+            client = Client()
+
+            consume(client)
+            first, total, size = consume(client)
+
+            tracemalloc.start()
+            consume(client)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            print("{number:>6} todos: first chunk {first:.4f}s, total {total:.3f}s, {size} KiB streamed, peak {peak} KiB".format(number=number, first=first, total=total, size=size // 1024, peak=peak // 1024))
+
+
+if __name__ == "__main__":
+    main(*[int(argument) for argument in sys.argv[1:]])
@@ -0,0 +1,93 @@
+"""
+Synthetic data for the benchmarks: todo.txt lines with a realistic mix of priorities, dates, recurrences, projects,
+contexts and completed todos, plus annotations. Generation is deterministic for a given seed.
+"""
+
+import contextlib
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+from itertools import islice
+from typing import Iterator
+
+from django.db import connection
+from django.utils import timezone
+
+from todoguardian.functions.counters import update_annotation_summaries
+from todoguardian.functions.todotxt import import_todos
+from todoguardian.models import Annotation, Todo
+
+WORDS = "call write review buy fix plan send prepare clean book check update order pay read meet schedule renew email draft".split()
+OBJECTS = "report invoice groceries car dentist budget slides taxes garden newsletter backup contract flights insurance roof".split()
+CONTEXTS = ["home", "work", "phone", "errands", "computer", "office", "garden", "car", "online", "waiting-for", "someday", "calls"]
+RECURRENCES = ["1d", "2d", "1w", "+1w", "2w", "1b", "+5b", "1m", "+1m", "3m", "1y"]
+ANNOTATIONS = ["Waiting for an answer", "Asked for a quote", "Moved because of holidays", "Needs the new numbers", "Discussed in the weekly meeting"]
+
+
+def generate_lines(number: int, seed: int = 0, today: date | None = None) -> Iterator[str]:
+    """
+    Yields `number` todo.txt lines: about 30% completed, 30% with a priority, 70% with a due date between 30 days ago
+    and 60 days ahead (some with a start date), 20% recurring, up to 3 projects out of roughly `sqrt(number) / 2`
+    and up to 2 contexts.
+    """
+    if today is None:
+        today = timezone.localdate()
+
+    generator = random.Random(seed)
+    projects = ["project-{i}".format(i=i) for i in range(max(int(number**0.5 / 2), 5))]
+
+    for i in range(number):
+        parts = []
+
+        if generator.random() < 0.3:
+            parts.append("x {completed}".format(completed=(today - timedelta(days=generator.randint(0, 365))).isoformat()))
+        elif generator.random() < 0.3:
+            parts.append("({priority})".format(priority=generator.choice("ABCD")))
+
+        parts.append("{verb} {object} {i}".format(verb=generator.choice(WORDS).capitalize(), object=generator.choice(OBJECTS), i=i))
+        parts.extend("+" + project for project in generator.sample(projects, generator.choice([0, 1, 1, 1, 2, 3])))
+        parts.extend("@" + context for context in generator.sample(CONTEXTS, generator.choice([0, 1, 1, 2])))
+
+        if generator.random() < 0.7:
+            due_date = today + timedelta(days=generator.randint(-30, 60))
+            parts.append("due:{due}".format(due=due_date.isoformat()))
+
+            if generator.random() < 0.3:
+                parts.append("t:{start}".format(start=(due_date - timedelta(days=generator.randint(0, 5))).isoformat()))
+
+        if generator.random() < 0.2:
+            parts.append("rec:{recurrence}".format(recurrence=generator.choice(RECURRENCES)))
+
+        yield " ".join(parts)
+
+
+def seed(number: int, random_seed: int = 0, annotated: float = 0.2, batch_size: int = 5000) -> None:
+    """Imports `number` generated todos and annotates a share of them with one to three annotations, both in batches of `batch_size`."""
+    sum(import_todos(generate_lines(number, random_seed), batch_size=batch_size))
+
+    generator = random.Random(random_seed)
+    todo_ids = iter(Todo.objects.order_by("id").values_list("id", flat=True).iterator(chunk_size=batch_size))
+    annotations = (Annotation(todo_id=id, text=generator.choice(ANNOTATIONS)) for id in todo_ids if generator.random() < annotated for _ in range(generator.randint(1, 3)))
+
+    while batch := list(islice(annotations, batch_size)):
+        Annotation.objects.bulk_create(batch)
+
+    update_annotation_summaries()
+
+
+@contextlib.contextmanager
+def temporary_database(path: str | None = None) -> Iterator[bool]:
+    """
+    Creates and migrates a database file for a benchmark, a temporary one unless `path` is given. An existing
+    database at `path` is kept (and migrated), so a large seeded dataset can be reused between runs.
+
+    Yields whether the database is empty.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        connection.settings_dict["TEST"]["NAME"] = path or os.path.join(directory, "bench.sqlite3")
+        connection.creation.create_test_db(verbosity=0, keepdb=path is not None)
+
+        yield not Todo.objects.exists()
+
+        connection.close()
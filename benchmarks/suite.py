@@ -0,0 +1,162 @@
+"""
+Times the main views and todo helpers on a generated dataset (see `benchmarks.data`) and records the median and
+minimum duration, the number of queries and the peak memory (traced separately, as tracing slows things down) of
+every case. Results are written as JSON and can be compared with a stored baseline: a case regresses when its
+fastest run (the least noisy figure) is more than `--threshold` slower or it runs more queries. Durations only
+compare on the same machine.
+
+Run with `python -m benchmarks.suite [--size 10000] [--output results.json] [--baseline benchmarks/baseline.json]`,
+use `--database` to keep a seeded database (e.g. with 1M todos) for later runs.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todo.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from benchmarks.data import generate_lines, seed, temporary_database  # noqa: E402
+from todoguardian.functions.date import to_date  # noqa: E402
+from todoguardian.functions.recurrence import advance_todo  # noqa: E402
+from todoguardian.models import Todo  # noqa: E402
+
+SAMPLE = 200
+DATE_PATTERNS = ["2024-06-07", "5d", "2w", "1m", "1y", "250b", "today", "tomorrow", "friday", "06/07/2024"]
+
+
+def measure(function: Callable[[], object], repeat: int) -> dict[str, float | int]:
+    """Runs a case once to warm up and count queries, `repeat` times for timing and once more traced for memory."""
+    queries = []
+
+    # Views reset the query log at the start of every request, so queries are counted as they are executed
+    with connection.execute_wrapper(lambda execute, sql, params, many, context: queries.append(sql) or execute(sql, params, many, context)):
+        function()
+
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"median": statistics.median(durations), "min": min(durations), "queries": len(queries), "peak_memory_kib": peak // 1024}
+
+
+def cases(client: Client) -> dict[str, Callable[[], object]]:
+    """Returns the benchmark cases. Helpers work on a fixed sample of todos, so their timings do not depend on the dataset size."""
+    todos = list(Todo.objects.order_by("id").prefetch_related("projects", "contexts")[:SAMPLE])
+    recurring = [todo for todo in todos if todo.recurrence] or todos[:1]
+    lines = list(generate_lines(SAMPLE, seed=1))
+
+    def get(name: str) -> Callable[[], object]:
+        def view() -> None:
+            response = client.get(reverse(name))
+            assert response.status_code == 200, response.status_code
+
+        return view
+
+    def from_string() -> None:
+        with transaction.atomic():
+            for line in lines:
+                Todo.from_string(line)
+
+            transaction.set_rollback(True)
+
+    return {
+        "dashboard": get("todoguardian:dashboard"),
+        "archive": get("todoguardian:archive"),
+        "projects": get("todoguardian:projects"),
+        "contexts": get("todoguardian:contexts"),
+        "from_string": from_string,
+        "to_string": lambda: [todo.to_string() for todo in todos],
+        "advance_todo": lambda: [advance_todo(todo, save=False) for todo in recurring],
+        "to_date": lambda: [to_date(pattern) for pattern in DATE_PATTERNS * 100],
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Returns a description of every case that regressed compared to the baseline."""
+    if baseline["size"] != results["size"]:
+        return ["baseline was recorded with {baseline} todos, not {size}".format(baseline=baseline["size"], size=results["size"])]
+
+    regressions = []
+    for name, result in results["cases"].items():
+        if name not in baseline["cases"]:
+            continue
+
+        reference = baseline["cases"][name]
+
+        if result["min"] > reference["min"] * (1 + threshold):
+            regressions.append("{name}: {min:.4f}s vs {reference:.4f}s".format(name=name, min=result["min"], reference=reference["min"]))
+
+        if result["queries"] > reference["queries"]:
+            regressions.append("{name}: {queries} queries vs {reference}".format(name=name, queries=result["queries"], reference=reference["queries"]))
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks views and todo helpers on generated data.")
+    parser.add_argument("--size", type=int, default=10000, help="Number of generated todos, e.g. 10000, 100000 or 1000000 (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed runs per case (default: %(default)s)")
+    parser.add_argument("--database", help="Database file to reuse (seeded if empty), default: a temporary one")
+    parser.add_argument("--output", help="Write the results to this JSON file (default: stdout)")
+    parser.add_argument("--baseline", help="JSON results to compare with, exits with 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown compared to the baseline (default: %(default)s)")
+    arguments = parser.parse_args()
+
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ["testserver"]
+
+    with temporary_database(arguments.database) as empty:
+        if empty:
+            start = time.perf_counter()
+            seed(arguments.size)
+            print("Seeded {size} todos in {duration:.1f}s".format(size=arguments.size, duration=time.perf_counter() - start), file=sys.stderr)
+
+        results = {
+            "size": Todo.objects.count(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "cases": {name: measure(function, arguments.repeat) for name, function in cases(Client()).items()},
+        }
+
+    output = json.dumps(results, indent=4)
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), arguments.threshold)
+
+        for regression in regressions:
+            print("Regression: " + regression, file=sys.stderr)
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
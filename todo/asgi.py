@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todo.settings")
+os.environ.setdefault("TODOGUARDIAN_ASYNC_VIEWS", "true")
+
+# Every request runs its sync code in a thread of its own, persistent connections would pile up
+os.environ.setdefault("DJANGO_CONN_MAX_AGE", "0")
 
 application = get_asgi_application()
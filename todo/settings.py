@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
 
 import environ
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "todoguardian.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -61,7 +63,8 @@ ROOT_URLCONF = "todo.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # The Django backend, timing renders for the Server-Timing header
+        "BACKEND": "todoguardian.functions.timing.DjangoTemplates",
         "DIRS": [
             BASE_DIR / "templates",
         ],
@@ -83,10 +86,33 @@ WSGI_APPLICATION = "todo.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Production SQLite profile (TODOGUARDIAN_SQLITE_PRODUCTION=true), for several workers sharing the database: WAL so
+# readers never block the writer, write transactions that take the lock up front and wait for it (busy_timeout)
+# instead of failing with "database is locked", and persistent connections. The pragmas are applied to every new
+# connection by `todoguardian.signals.configure_sqlite`.
+TODOGUARDIAN_SQLITE_PRODUCTION = ENV.bool("TODOGUARDIAN_SQLITE_PRODUCTION", default=False)
+
+TODOGUARDIAN_SQLITE_PRAGMAS = (
+    {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": ENV.int("TODOGUARDIAN_SQLITE_BUSY_TIMEOUT", default=5000),
+        "mmap_size": ENV.int("TODOGUARDIAN_SQLITE_MMAP_SIZE", default=256 * 1024 * 1024),
+        "cache_size": -ENV.int("TODOGUARDIAN_SQLITE_CACHE_KIB", default=64 * 1024),
+        "temp_store": "MEMORY",
+    }
+    if TODOGUARDIAN_SQLITE_PRODUCTION
+    else {}
+)
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Connections are per thread, keep them at 0 under ASGI (see todo/asgi.py)
+        "CONN_MAX_AGE": ENV.int("DJANGO_CONN_MAX_AGE", default=600 if TODOGUARDIAN_SQLITE_PRODUCTION else 0),
+        "CONN_HEALTH_CHECKS": TODOGUARDIAN_SQLITE_PRODUCTION,
+        "OPTIONS": {"transaction_mode": "IMMEDIATE"} if TODOGUARDIAN_SQLITE_PRODUCTION else {},
     }
 }
 
@@ -140,4 +166,20 @@ STATICFILES_FINDERS = [
     "compressor.finders.CompressorFinder",
 ]
 
+# Request timings (todoguardian.middleware.ServerTimingMiddleware), one line per request at INFO and a warning for
+# requests over their query budget
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {"todoguardian.middleware": {"handlers": ["console"], "level": ENV.str("TODOGUARDIAN_TIMING_LOG_LEVEL", default="INFO"), "propagate": False}},
+}
+
 TEST_RUNNER = "teamcity.django.TeamcityDjangoRunner"
+
+# Route the dashboard, archive and todo actions to their async views, set by default by the ASGI entry point
+TODOGUARDIAN_ASYNC_VIEWS = ENV.bool("TODOGUARDIAN_ASYNC_VIEWS", default=False)
+
+# Recurrence materializer (manage.py materialize_recurrences): the lock file that keeps several workers from running
+# at the same time
+TODOGUARDIAN_RECURRENCE_LOCK_FILE = ENV.str("TODOGUARDIAN_RECURRENCE_LOCK_FILE", default=str(Path(tempfile.gettempdir()) / "todoguardian-recurrence.lock"))
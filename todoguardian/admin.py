@@ -7,7 +7,9 @@ from django.utils import timezone
 from django.utils.safestring import mark_safe
 from django.utils.translation import ngettext
 
-from .functions.recurrence import NoRecurrenceException, advance_todo
+from .functions.counters import update_counts
+from .functions.recurrence import complete_todos
+from .functions.search import get_backend
 from .models import Context, Project, Todo, Annotation
 
 
@@ -21,13 +23,7 @@ class AnnotationInline(admin.TabularInline):
 class TodoAdmin(admin.ModelAdmin):
     @admin.action(description="Mark selected todos as completed")
     def mark_completed(self, request, queryset):
-        updated = queryset.update(completion_date=timezone.localdate(), _completed=True)
-
-        for todo in queryset:
-            try:
-                advance_todo(todo)
-            except NoRecurrenceException:
-                pass
+        updated = complete_todos(queryset)
 
         self.message_user(
             request,
@@ -42,7 +38,9 @@ class TodoAdmin(admin.ModelAdmin):
 
     @admin.action(description="Mark selected todos as not completed")
     def mark_not_completed(self, request, queryset):
-        updated = queryset.update(completion_date=None, _completed=False)
+        ids = list(queryset.filter(completion_date__isnull=False).values_list("pk", flat=True))
+        updated = Todo.objects.filter(pk__in=ids).update(completion_date=None, _completed=False, modified=timezone.now())
+        update_counts({id: (True, False) for id in ids})
 
         self.message_user(
             request,
@@ -56,14 +54,15 @@ class TodoAdmin(admin.ModelAdmin):
         )
 
     def list_projects(self, instance) -> str:
-        projects = [project.name for project in instance.projects.order_by("name")]
+        # Sorted here, ordering the queryset would bypass the prefetched projects
+        projects = sorted(project.name for project in instance.projects.all())
 
         return mark_safe("<br />".join(projects))
 
     list_projects.short_description = "Projects"
 
     def list_contexts(self, instance) -> str:
-        contexts = [context.name for context in instance.contexts.order_by("name")]
+        contexts = sorted(context.name for context in instance.contexts.all())
 
         return mark_safe("<br />".join(contexts))
 
@@ -74,6 +73,12 @@ class TodoAdmin(admin.ModelAdmin):
 
         return queryset.prefetch_related("projects", "contexts")
 
+    def get_search_results(self, request: HttpRequest, queryset: QuerySet[Any], search_term: str) -> tuple[QuerySet[Any], bool]:
+        if not search_term.strip():
+            return queryset, False
+
+        return get_backend().filter_todos(queryset, search_term), False
+
     date_hierarchy = "due_date"
     list_display = ["id", "description", "priority", "due_date", "start_date", "_completed", "list_projects", "list_contexts"]
     list_display_links = ["description"]
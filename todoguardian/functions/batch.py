@@ -0,0 +1,151 @@
+from typing import Any
+
+from django.db import transaction
+from django.utils import timezone
+from pytodotxt import Task
+
+from ..models import Todo
+from .counters import update_counts
+from .date import to_date
+from .recurrence import complete_todos
+from .todotxt import create_todos, link_todos, task_names
+
+OPERATIONS = ["create", "update", "complete", "uncomplete", "postpone"]
+MAX_OPERATIONS = 1000
+
+# Fields written by update, postpone and uncomplete operations
+UPDATE_FIELDS = ["description", "priority", "completion_date", "_completed", "due_date", "start_date", "recurrence", "modified"]
+
+
+class InvalidOperationException(Exception):
+    pass
+
+
+def parse_operation(operation: Any) -> dict[str, Any]:
+    """
+    Validates a single batch operation, a bare todo.txt string is a shorthand for a create operation.
+
+    Accepted operations:
+    * `{"op": "create", "todo": "<todo.txt string>"}`
+    * `{"op": "update", "id": 1, "todo": "<todo.txt string>"}`
+    * `{"op": "complete", "id": 1}` and `{"op": "uncomplete", "id": 1}`
+    * `{"op": "postpone", "id": 1, "pattern": "3d"}`
+    """
+    if isinstance(operation, str):
+        operation = {"op": "create", "todo": operation}
+
+    if not isinstance(operation, dict):
+        raise InvalidOperationException("operation must be an object or a todo.txt string")
+
+    if operation.get("op") not in OPERATIONS:
+        raise InvalidOperationException("op must be one of: {operations}".format(operations=", ".join(OPERATIONS)))
+
+    if operation["op"] != "create" and (type(operation.get("id")) is not int):
+        raise InvalidOperationException("id must be an integer")
+
+    if operation["op"] in ["create", "update"] and (not isinstance(operation.get("todo"), str) or operation["todo"].strip() == ""):
+        raise InvalidOperationException("todo must be a non-empty todo.txt string")
+
+    if operation["op"] == "postpone" and (not isinstance(operation.get("pattern"), str) or to_date(operation["pattern"]) is None):
+        raise InvalidOperationException("pattern must be a valid date pattern")
+
+    return operation
+
+
+def apply_operations(operations: list[Any]) -> dict[str, list[dict[str, Any]]]:
+    """
+    Applies a list of operations (see `parse_operation`) in a single transaction and returns a result per operation,
+    in the same order.
+
+    Operations are grouped by kind so every kind costs a fixed number of queries: creates are written with
+    `bulk_create`, updates, postpones and uncompletes with one `bulk_update` and completes through `complete_todos`.
+    As a consequence a todo can only be changed once per batch. Invalid operations are reported as errors and
+    do not prevent the other operations from being applied.
+    """
+    results = [{"index": index, "status": "ok"} for index in range(len(operations))]
+    valid = {}
+    ids = set()
+
+    for index, operation in enumerate(operations):
+        try:
+            operation = parse_operation(operation)
+
+            if operation["op"] != "create":
+                if operation["id"] in ids:
+                    raise InvalidOperationException("todo is changed more than once in this batch")
+
+                ids.add(operation["id"])
+
+        except InvalidOperationException as exception:
+            results[index].update(status="error", error=str(exception))
+            continue
+
+        valid[index] = operation
+
+    with transaction.atomic():
+        todos = Todo.objects.in_bulk(ids)
+        completed = {id: todo.is_completed for id, todo in todos.items()}
+
+        for index, operation in list(valid.items()):
+            if operation["op"] != "create" and operation["id"] not in todos:
+                results[index].update(status="error", error="todo does not exist")
+                del valid[index]
+
+        creates = [index for index, operation in valid.items() if operation["op"] == "create"]
+        for index, todo in zip(creates, create_todos([valid[index]["todo"] for index in creates])):
+            results[index]["id"] = todo.id
+
+        changed, updated, todo_projects, todo_contexts = [], [], [], []
+        for index, operation in valid.items():
+            if operation["op"] == "create":
+                continue
+
+            todo = todos[operation["id"]]
+            results[index]["id"] = todo.id
+
+            match operation["op"]:
+                case "update":
+                    task = Task(operation["todo"])
+                    todo.set_fields_from_task(task)
+
+                    projects, contexts = task_names(task)
+                    updated.append(todo)
+                    todo_projects.append(projects)
+                    todo_contexts.append(contexts)
+
+                case "postpone":
+                    todo.postpone(operation["pattern"], save=False)
+
+                case "uncomplete":
+                    todo.completion_date = None
+                    todo._completed = False
+
+                case _:
+                    continue
+
+            todo.modified = timezone.now()
+            changed.append(todo)
+
+        Todo.objects.bulk_update(changed, UPDATE_FIELDS)
+
+        # Updated todos are unlinked and linked again below, the others keep their links but may change state
+        relinked = {todo.id for todo in updated}
+        update_counts({todo.id: (completed[todo.id], None if todo.id in relinked else todo.is_completed) for todo in changed})
+
+        if updated:
+            Todo.projects.through.objects.filter(todo_id__in=[todo.id for todo in updated]).delete()
+            Todo.contexts.through.objects.filter(todo_id__in=[todo.id for todo in updated]).delete()
+            link_todos(updated, todo_projects, todo_contexts)
+
+        completes = [operation["id"] for operation in valid.values() if operation["op"] == "complete"]
+        if completes:
+            complete_todos(Todo.objects.filter(pk__in=completes))
+
+    # Report the resulting todo.txt string of every todo touched
+    strings = {todo.id: todo.to_string() for todo in Todo.objects.filter(pk__in=[result["id"] for result in results if "id" in result]).prefetch_related("projects", "contexts")}
+
+    for result in results:
+        if "id" in result:
+            result["todo"] = strings[result["id"]]
+
+    return {"results": results}
@@ -0,0 +1,115 @@
+import hashlib
+from datetime import datetime, time
+from functools import wraps
+from inspect import iscoroutinefunction
+from typing import Callable, Iterable
+
+from django.contrib import messages
+from django.db.models import CharField, Count, DateTimeField, Max, QuerySet, Value
+from django.http import HttpRequest, HttpResponse
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from ..models import Annotation, Context, Project, Todo
+
+
+def _validator_query(collection: type[Project] | type[Context] | None = None) -> QuerySet:
+    """
+    Returns a single query reading the last modification and row count of todos and annotations (and the row count of
+    the given collection), one row per table. SQLite answers each part with a scan of the index on `modified`.
+    """
+    tables = [(Todo, "todos", Max("modified")), (Annotation, "annotations", Max("modified"))]
+    if collection is not None:
+        tables.append((collection, collection._meta.model_name, Value(None, output_field=DateTimeField())))
+
+    queries = [model.objects.order_by().values(table=Value(name, output_field=CharField())).annotate(modified=modified, count=Count("pk")) for model, name, modified in tables]
+
+    return queries[0].union(*queries[1:], all=True)
+
+
+def _validator(request: HttpRequest, collection: type[Project] | type[Context] | None = None) -> dict | None:
+    """
+    Returns the state a todo list page depends on: the last modification and row count of todos and annotations
+    (and the row count of the given collection), plus the current date as due badges change at midnight. Changes to
+    the projects and contexts of todos show up in their `modified`, see `touch_todos`. Computed once per request,
+    with a single query.
+
+    Returns None while messages are waiting to be shown, so such responses are never answered with a 304.
+    """
+    if len(messages.get_messages(request)) > 0:
+        return None
+
+    if not hasattr(request, "_todoguardian_validator"):
+        validator = {row["table"]: (row["modified"], row["count"]) for row in _validator_query(collection)}
+        validator["today"] = timezone.localdate()
+
+        request._todoguardian_validator = validator
+
+    return request._todoguardian_validator
+
+
+async def _avalidator(request: HttpRequest, collection: type[Project] | type[Context] | None = None) -> None:
+    """Computes the validator of `_validator` with the async ORM, so it is only read from the request afterwards."""
+    if len(messages.get_messages(request)) > 0 or hasattr(request, "_todoguardian_validator"):
+        return
+
+    validator = {row["table"]: (row["modified"], row["count"]) async for row in _validator_query(collection)}
+    validator["today"] = timezone.localdate()
+
+    request._todoguardian_validator = validator
+
+
+def touch_todos(todo_ids: Iterable[int]) -> datetime:
+    """
+    Marks the given todos as modified without saving them, for changes the validator would not see otherwise: their
+    projects and contexts being linked, unlinked, renamed or deleted. Returns the new modification time.
+    """
+    modified = timezone.now()
+    Todo.objects.filter(pk__in=list(todo_ids)).update(modified=modified)
+
+    return modified
+
+
+def conditional_todos(collection: type[Project] | type[Context] | None = None) -> Callable:
+    """
+    Decorator adding ETag and Last-Modified headers to a view listing todos (or the given collection), answering
+    `If-None-Match` and `If-Modified-Since` with a 304 before the view runs.
+
+    The ETag covers every part of the validator. Last-Modified cannot express deletions, so browsers (which send
+    both headers) rely on the ETag for those.
+
+    Async views are supported as well: Django calls the header functions synchronously, so the validator is
+    computed with the async ORM before they run.
+    """
+
+    def etag(request: HttpRequest, *args, **kwargs) -> str | None:
+        validator = _validator(request, collection)
+        if validator is None:
+            return None
+
+        return hashlib.md5(repr(sorted(validator.items())).encode(), usedforsecurity=False).hexdigest()
+
+    def last_modified(request: HttpRequest, *args, **kwargs) -> datetime | None:
+        validator = _validator(request, collection)
+        if validator is None:
+            return None
+
+        midnight = timezone.make_aware(datetime.combine(validator["today"], time.min))
+
+        return max(modified for modified in [validator["todos"][0], validator["annotations"][0], midnight] if modified is not None)
+
+    def decorator(view: Callable) -> Callable:
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        if not iscoroutinefunction(view):
+            return conditional_view
+
+        @wraps(view)
+        async def inner(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            await _avalidator(request, collection)
+
+            return await conditional_view(request, *args, **kwargs)
+
+        return inner
+
+    return decorator
@@ -0,0 +1,88 @@
+from collections import defaultdict
+from typing import Iterable
+
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Substr
+
+from ..models import Annotation, Context, Project, Todo
+
+PREVIEW_LENGTH = Todo._meta.get_field("annotation_preview").max_length
+
+# Counted collections with the name of their relation on Todo and the column in its through table
+COLLECTIONS = [(Project, "projects", "project_id"), (Context, "contexts", "context_id")]
+
+
+def collection_model(through: type) -> type[Project] | type[Context]:
+    """Returns the collection model of a Todo through table."""
+    return Project if through is Todo.projects.through else Context
+
+
+def add_counts(model: type[Project] | type[Context], deltas: dict[int, list[int]]) -> None:
+    """Adds `[open, completed]` deltas to the counters of the given collections, in a single update."""
+    deltas = {pk: delta for pk, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+
+    def shift(field: str, index: int) -> F:
+        whens = [When(pk=pk, then=Value(delta[index])) for pk, delta in deltas.items() if delta[index]]
+
+        return F(field) + Case(*whens, default=Value(0), output_field=IntegerField()) if whens else F(field)
+
+    model.objects.filter(pk__in=deltas).update(open_count=shift("open_count", 0), completed_count=shift("completed_count", 1))
+
+
+def update_counts(todos: dict[int, tuple[bool | None, bool | None]]) -> None:
+    """
+    Updates the counters of all collections linked to the given todos, passed as `id -> (completed before, completed after)`.
+    Use None as before for todos that were not counted yet and None as after for todos that should no longer be counted
+    (e.g. right before they are deleted or unlinked). Costs one query per collection type to read the links, plus one
+    update per collection type with changes.
+    """
+    todos = {id: states for id, states in todos.items() if states[0] != states[1]}
+    if not todos:
+        return
+
+    for model, field, column in COLLECTIONS:
+        deltas = defaultdict(lambda: [0, 0])
+
+        for todo_id, collection_id in getattr(Todo, field).through.objects.filter(todo_id__in=list(todos)).values_list("todo_id", column):
+            before, after = todos[todo_id]
+
+            if before is not None:
+                deltas[collection_id][before] -= 1
+            if after is not None:
+                deltas[collection_id][after] += 1
+
+        add_counts(model, deltas)
+
+
+def recount(model: type[Project] | type[Context], ids: Iterable[int] | None = None) -> int:
+    """Recalculates the counters of the given collections (default: all) from the todos, returns the number of collections updated."""
+    field, column = next((field, column) for counted, field, column in COLLECTIONS if counted is model)
+    through = getattr(Todo, field).through
+
+    def count(completed: bool) -> Coalesce:
+        links = through.objects.filter(Q(**{column: OuterRef("pk")}), todo__completion_date__isnull=not completed).order_by().values(column).annotate(count=Count("*")).values("count")
+
+        return Coalesce(Subquery(links), Value(0))
+
+    collections = model.objects.all() if ids is None else model.objects.filter(pk__in=list(ids))
+
+    return collections.update(open_count=count(False), completed_count=count(True))
+
+
+def update_annotation_summaries(todo_ids: Iterable[int] | None = None) -> int:
+    """
+    Recalculates `annotation_count`, `last_annotated` and `annotation_preview` (the start of the latest annotation)
+    of the given todos (default: all) with a single update, returns the number of todos updated.
+    """
+    annotations = Annotation.objects.filter(todo_id=OuterRef("pk")).order_by()
+    latest = Annotation.objects.filter(todo_id=OuterRef("pk")).order_by("-created", "-id")
+
+    todos = Todo.objects.all() if todo_ids is None else Todo.objects.filter(pk__in=list(todo_ids))
+
+    return todos.update(
+        annotation_count=Coalesce(Subquery(annotations.values("todo_id").annotate(count=Count("*")).values("count")), Value(0)),
+        last_annotated=Subquery(latest.values("created")[:1]),
+        annotation_preview=Coalesce(Subquery(latest.values(preview=Substr("text", 1, PREVIEW_LENGTH))[:1]), Value("")),
+    )
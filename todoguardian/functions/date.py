@@ -1,10 +1,30 @@
 import re
-from datetime import date
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 
 from dateutil.relativedelta import FR, MO, SA, SU, TH, TU, WE, relativedelta
 from dateutil import parser
 from django.utils import timezone
 
+RELATIVE_PATTERN = re.compile("(?P<length>-?[0-9]+)(?P<period>[dwmyb])$", re.I)
+WEEKDAY_PATTERN = re.compile(
+    "|".join(
+        [
+            "mo(n(day)?)?$",
+            "tu(e(sday)?)?$",
+            "we(d(nesday)?)?$",
+            "th(u(rsday)?)?$",
+            "fr(i(day)?)?$",
+            "sa(t(urday)?)?$",
+            "su(n(day)?)?$",
+        ]
+    )
+)
+TODAY_PATTERN = re.compile("tod(ay)?$")
+TOMORROW_PATTERN = re.compile("tom(orrow)?$")
+YESTERDAY_PATTERN = re.compile("yes(terday)?$")
+ISO_PATTERN = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}$")
+
 
 def to_date(pattern: str, offset: date | None = None) -> date | None:
     """
@@ -18,45 +38,64 @@ def to_date(pattern: str, offset: date | None = None) -> date | None:
     Absolute dates are calculated in relation the offset date. If not set, a default value of
     `timezone.localdate()` will be used as offet.
     """
+    today = timezone.localdate()
+
     # Check if offset is set, if not set to today
     if offset is None:
-        offset = timezone.localdate()
+        offset = today
 
-    relative_pattern = re.match("(?P<length>-?[0-9]+)(?P<period>[dwmyb])$", pattern, re.I)
+    return _to_date(pattern, offset, today)
 
-    monday = "mo(n(day)?)?$"
-    tuesday = "tu(e(sday)?)?$"
-    wednesday = "we(d(nesday)?)?$"
-    thursday = "th(u(rsday)?)?$"
-    friday = "fr(i(day)?)?$"
-    saturday = "sa(t(urday)?)?$"
-    sunday = "su(n(day)?)?$"
-    weekday_pattern = re.match("|".join([monday, tuesday, wednesday, thursday, friday, saturday, sunday]), pattern)
 
-    if relative_pattern:
-        length = relative_pattern.group("length")
-        period = relative_pattern.group("period")
-        return _calculate_date_from_pattern(length, period, offset)
+@lru_cache(maxsize=4096)
+def _to_date(pattern: str, offset: date, today: date) -> date | None:
+    """Memoized implementation of `to_date`, today is part of the key as some patterns are relative to it."""
+    kind, value = _compile_pattern(pattern)
+
+    match kind:
+        case "relative":
+            return _calculate_date_from_pattern(*value, offset)
+        case "weekday":
+            return _calculate_date_from_weekday(value, today)
+        case "today":
+            return _calculate_date_from_pattern(value, "d", today)
+        case "iso":
+            return value
+        case _:
+            # Maybe it's a string we can convert directly into a date?
+            try:
+                return parser.parse(pattern, default=datetime(today.year, today.month, today.day)).date()
+
+            except parser.ParserError:
+                return None
 
-    elif weekday_pattern:
-        return _calculate_date_from_weekday(weekday_pattern.group(0))
 
-    elif re.match("tod(ay)?$", pattern):
-        return _calculate_date_from_pattern(0, "d")
+@lru_cache(maxsize=1024)
+def _compile_pattern(pattern: str) -> tuple[str, object]:
+    """Classifies a pattern once, returning the kind of pattern and the values needed to calculate the date."""
+    if relative_pattern := RELATIVE_PATTERN.match(pattern):
+        return "relative", (int(relative_pattern.group("length")), relative_pattern.group("period"))
 
-    elif re.match("tom(orrow)?$", pattern):
-        return _calculate_date_from_pattern(1, "d")
+    if weekday_pattern := WEEKDAY_PATTERN.match(pattern):
+        return "weekday", weekday_pattern.group(0)
 
-    elif re.match("yes(terday)?$", pattern):
-        return _calculate_date_from_pattern(-1, "d")
+    if TODAY_PATTERN.match(pattern):
+        return "today", 0
 
-    else:
-        # Maybe it's a string we can convert directly into a date?
+    if TOMORROW_PATTERN.match(pattern):
+        return "today", 1
+
+    if YESTERDAY_PATTERN.match(pattern):
+        return "today", -1
+
+    if ISO_PATTERN.match(pattern):
         try:
-            return parser.parse(pattern).date()
+            return "iso", date.fromisoformat(pattern)
 
-        except parser.ParserError:
-            return None
+        except ValueError:
+            pass
+
+    return "parse", None
 
 
 def _calculate_date_from_pattern(length: int | str, period: str, offset: date | None = None) -> date | None:
@@ -69,31 +108,45 @@ def _calculate_date_from_pattern(length: int | str, period: str, offset: date |
 
     match period:
         case "d":
-            return offset + relativedelta(days=length)
+            return offset + timedelta(days=length)
         case "w":
-            return offset + relativedelta(weeks=length)
+            return offset + timedelta(weeks=length)
         case "m":
             return offset + relativedelta(months=length)
         case "y":
             return offset + relativedelta(years=length)
         case "b":
-            result = offset
-            days = length
-            delta = 1 if days > 0 else -1
+            return _add_business_days(offset, length)
+        case _:
+            return None
 
-            while abs(days) > 0:
-                result = result + relativedelta(days=delta)
-                if result.weekday() >= 5:
-                    continue
 
-                days = days - delta
+def _add_business_days(offset: date, length: int) -> date:
+    """
+    Moves `length` business days (monday through friday) away from offset, in constant time. Weekend days are skipped
+    but the offset itself is returned as is for a length of 0, even on a weekend.
+    """
+    if length == 0:
+        return offset
 
-            return result
-        case _:
-            return None
+    weekday = offset.weekday()
+    weeks, days = divmod(abs(length), 5)
 
+    if length > 0:
+        # Counting forward from a weekend day is the same as counting from the friday before
+        if weekday >= 5:
+            offset, weekday = offset - timedelta(days=weekday - 4), 4
 
-def _calculate_date_from_weekday(weekday: str) -> date:
+        return offset + timedelta(days=weeks * 7 + days + (2 if weekday + days >= 5 else 0))
+
+    # Counting backward from a weekend day is the same as counting from the monday after
+    if weekday >= 5:
+        offset, weekday = offset + timedelta(days=7 - weekday), 0
+
+    return offset - timedelta(days=weeks * 7 + days + (2 if weekday - days < 0 else 0))
+
+
+def _calculate_date_from_weekday(weekday: str, today: date | None = None) -> date:
     """Converts a given weekday into an absolute day, always taking the next option (so if today = monday, monday will given the next monday)."""
     weekday_to_relativedelta = {
         "mo": MO(+1),
@@ -105,4 +158,7 @@ def _calculate_date_from_weekday(weekday: str) -> date:
         "su": SU(+1),
     }
 
-    return timezone.localdate() + relativedelta(days=1, weekday=weekday_to_relativedelta[weekday[:2]])
+    if today is None:
+        today = timezone.localdate()
+
+    return today + relativedelta(days=1, weekday=weekday_to_relativedelta[weekday[:2]])
@@ -0,0 +1,113 @@
+import hashlib
+from datetime import date
+from functools import lru_cache
+from typing import Iterable
+
+from django.contrib.humanize.templatetags.humanize import naturalday, naturaltime
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.html import escape
+from django.utils.safestring import SafeString, mark_safe
+from django.utils.text import capfirst
+
+from .rows import TodoRow
+
+FRAGMENT_TEMPLATES = ["templatetags/show_todo.html", "templatetags/show_todo_card.html", "templatetags/show_todo_modals.html"]
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+# Due badge of each fragment, rendered separately as whether a todo is due soon or overdue changes at midnight
+DUE_BADGE_TEMPLATES = {"templatetags/show_todo.html": "templatetags/show_todo_due.html", "templatetags/show_todo_card.html": "templatetags/show_todo_card_due.html"}
+
+# Rendered in place of the CSRF token, which differs per request, and swapped for the real token on every render
+CSRF_PLACEHOLDER = "__todoguardian_csrf_token__"
+
+# Rendered in place of the relative time of the latest annotation (passed as `last_annotated`), which changes every minute
+LAST_ANNOTATED_PLACEHOLDER = "__todoguardian_last_annotated__"
+
+# Rendered in place of the date-dependent parts (passed as `due_badge`, `start_day` and `due_day`), which change at midnight
+DUE_BADGE_PLACEHOLDER = "__todoguardian_due_badge__"
+START_DAY_PLACEHOLDER = "__todoguardian_start_day__"
+DUE_DAY_PLACEHOLDER = "__todoguardian_due_day__"
+
+
+def fragment_key(template_name: str, todo_id: int) -> str:
+    return "todoguardian:fragment:{template_name}:{todo_id}".format(template_name=template_name, todo_id=todo_id)
+
+
+def todo_fingerprint(todo: TodoRow) -> str:
+    """
+    Returns a fingerprint of everything a rendered todo depends on: the todo itself (through `modified`), its projects,
+    contexts and the annotation summary. The due badge, natural days and relative time of the latest annotation are
+    filled in on every render instead, so they do not expire the fragment.
+    """
+    parts = [
+        todo.id,
+        todo.modified.isoformat(),
+        todo.projects,
+        todo.contexts,
+        (todo.annotation_count, todo.annotation_preview, todo.last_annotated),
+    ]
+
+    return hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def render_todo_fragment(template_name: str, todo: TodoRow, csrf_token: str | None = None, store: bool = True) -> SafeString:
+    """
+    Renders a template for a single todo, reusing the cached result as long as the fingerprint of the todo did not
+    change. With `store` False a fragment that has to be rendered is not added to the cache, for pages listing more
+    todos than the cache holds, which would otherwise evict the fragments of the paginated pages.
+    """
+    key = fragment_key(template_name, todo.id)
+    fingerprint = todo_fingerprint(todo)
+
+    cached = cache.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        html = cached[1]
+    else:
+        context = {
+            "todo": todo,
+            "csrf_token": CSRF_PLACEHOLDER,
+            "last_annotated": LAST_ANNOTATED_PLACEHOLDER,
+            "due_badge": DUE_BADGE_PLACEHOLDER,
+            "start_day": START_DAY_PLACEHOLDER,
+            "due_day": DUE_DAY_PLACEHOLDER,
+        }
+        html = render_to_string(template_name, context)
+
+        if store:
+            cache.set(key, (fingerprint, html), FRAGMENT_TIMEOUT)
+
+    last_annotated = str(escape(naturaltime(todo.last_annotated))) if todo.last_annotated else ""
+    due = "soon" if todo.is_due_soon else "past" if todo.is_overdue else ""
+
+    replacements = {
+        CSRF_PLACEHOLDER: str(csrf_token or ""),
+        LAST_ANNOTATED_PLACEHOLDER: last_annotated,
+        DUE_BADGE_PLACEHOLDER: due_badge(template_name, due) if due else "",
+        START_DAY_PLACEHOLDER: natural_day(todo.start_date),
+        DUE_DAY_PLACEHOLDER: natural_day(todo.due_date),
+    }
+
+    for placeholder, value in replacements.items():
+        html = html.replace(placeholder, value)
+
+    return mark_safe(html)
+
+
+@lru_cache
+def due_badge(template_name: str, due: str) -> str:
+    """Returns the due badge shown in a fragment for todos due soon (`soon`) or overdue (`past`)."""
+    return render_to_string(DUE_BADGE_TEMPLATES[template_name], {"due": due}) if template_name in DUE_BADGE_TEMPLATES else ""
+
+
+def natural_day(day: date | None) -> str:
+    """Returns a date as shown in the fragments (e.g. "Today" or "Mon 01.01.2024"), or "-" without a date."""
+    if day is None:
+        return "-"
+
+    return str(escape(capfirst(naturalday(day, "D d.m.Y"))))
+
+
+def invalidate_todo_fragments(todo_ids: Iterable[int]) -> None:
+    """Removes the cached fragments of the given todos."""
+    cache.delete_many([fragment_key(template_name, todo_id) for todo_id in todo_ids for template_name in FRAGMENT_TEMPLATES])
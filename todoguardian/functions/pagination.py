@@ -0,0 +1,125 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date
+
+from django.db import connection
+from django.db.models import BooleanField, F, Q, QuerySet
+from django.db.models.expressions import RawSQL
+
+from ..models import Todo
+
+PAGE_SIZE = 50
+
+
+class InvalidCursorException(Exception):
+    pass
+
+
+@dataclass
+class KeysetPage:
+    """A page of todos with the cursors to the neighbouring pages (None if there is no such page)."""
+
+    todos: list[Todo]
+    next_cursor: str | None = None
+    previous_cursor: str | None = None
+
+    # Query strings leading to the neighbouring pages and to all todos on a single (streamed) page, set by the views
+    next_query: str | None = None
+    previous_query: str | None = None
+    all_query: str | None = None
+
+
+def encode_cursor(todo: Todo) -> str:
+    """Encodes the sort key of a todo, `(due_date_value, start_date_value, priority, id)`, into a URL safe cursor."""
+    key = [todo.due_date_value.isoformat(), todo.start_date_value.isoformat(), todo.priority, todo.id]
+
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[date, date, str | None, int]:
+    """Decodes a cursor created by `encode_cursor`, raises `InvalidCursorException` on garbage."""
+    try:
+        due_date_value, start_date_value, priority, id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+
+        return date.fromisoformat(due_date_value), date.fromisoformat(start_date_value), priority, int(id)
+
+    except (binascii.Error, TypeError, ValueError) as exception:
+        raise InvalidCursorException() from exception
+
+
+def _date_bound(operator: str, due_date_value: date, start_date_value: date) -> RawSQL:
+    """
+    Returns a row value comparison on `(due_date_value, start_date_value)`. It is implied by the exact filters
+    below, but unlike their OR chain it lets the database seek into the sort index instead of scanning it.
+    """
+    columns = ", ".join("{table}.{column}".format(table=connection.ops.quote_name(Todo._meta.db_table), column=connection.ops.quote_name(column)) for column in ["due_date_value", "start_date_value"])
+    params = [connection.ops.adapt_datefield_value(due_date_value), connection.ops.adapt_datefield_value(start_date_value)]
+
+    return RawSQL("({columns}) {operator} (%s, %s)".format(columns=columns, operator=operator), params, output_field=BooleanField())
+
+
+def _after(due_date_value: date, start_date_value: date, priority: str | None, id: int) -> Q:
+    """Returns the filter for all todos sorted after the given key, todos without priority sort first."""
+    priority_after = Q(priority__isnull=False) if priority is None else Q(priority__gt=priority)
+    priority_equal = Q(priority__isnull=True) if priority is None else Q(priority=priority)
+
+    return Q(_date_bound(">=", due_date_value, start_date_value)) & (
+        Q(due_date_value__gt=due_date_value) | Q(due_date_value=due_date_value, start_date_value__gt=start_date_value) | Q(due_date_value=due_date_value, start_date_value=start_date_value) & (priority_after | priority_equal & Q(id__gt=id))
+    )
+
+
+def _before(due_date_value: date, start_date_value: date, priority: str | None, id: int) -> Q:
+    """Returns the filter for all todos sorted before the given key, todos without priority sort first."""
+    priority_before = Q(pk__in=[]) if priority is None else Q(priority__lt=priority) | Q(priority__isnull=True)
+    priority_equal = Q(priority__isnull=True) if priority is None else Q(priority=priority)
+
+    return Q(_date_bound("<=", due_date_value, start_date_value)) & (
+        Q(due_date_value__lt=due_date_value) | Q(due_date_value=due_date_value, start_date_value__lt=start_date_value) | Q(due_date_value=due_date_value, start_date_value=start_date_value) & (priority_before | priority_equal & Q(id__lt=id))
+    )
+
+
+ORDERING = [F("due_date_value").asc(), F("start_date_value").asc(), F("priority").asc(nulls_first=True), F("id").asc()]
+
+
+def _page_query(todos: QuerySet[Todo], after: str | None, before: str | None, page_size: int) -> QuerySet[Todo]:
+    """Returns the query fetching a page plus one extra todo, which tells whether there is a neighbouring page in the direction of travel."""
+    if before is not None:
+        return todos.filter(_before(*decode_cursor(before))).order_by(*[order.copy().reverse_ordering() for order in ORDERING])[: page_size + 1]
+
+    if after is not None:
+        todos = todos.filter(_after(*decode_cursor(after)))
+
+    return todos.order_by(*ORDERING)[: page_size + 1]
+
+
+def _page(rows: list[Todo], after: str | None, before: str | None, page_size: int) -> KeysetPage:
+    if before is not None:
+        has_previous, page = len(rows) > page_size, rows[:page_size][::-1]
+
+        return KeysetPage(page, next_cursor=encode_cursor(page[-1]) if page else before, previous_cursor=encode_cursor(page[0]) if has_previous else None)
+
+    has_next, page = len(rows) > page_size, rows[:page_size]
+
+    return KeysetPage(
+        page,
+        next_cursor=encode_cursor(page[-1]) if has_next else None,
+        previous_cursor=(encode_cursor(page[0]) if page else after) if after is not None else None,
+    )
+
+
+def paginate(todos: QuerySet[Todo], after: str | None = None, before: str | None = None, page_size: int = PAGE_SIZE) -> KeysetPage:
+    """
+    Returns a single page of todos using keyset pagination on `(due_date_value, start_date_value, priority, id)`.
+
+    Pass the `next_cursor` of a page as `after` to get the next page, or its `previous_cursor` as `before`
+    to get the previous page. Each page is a single indexed range query, so deep pages cost the same as
+    the first one.
+    """
+    return _page(list(_page_query(todos, after, before, page_size)), after, before, page_size)
+
+
+async def apaginate(todos: QuerySet[Todo], after: str | None = None, before: str | None = None, page_size: int = PAGE_SIZE) -> KeysetPage:
+    """Async version of `paginate`, prefetches on the queryset are resolved as well."""
+    return _page([todo async for todo in _page_query(todos, after, before, page_size)], after, before, page_size)
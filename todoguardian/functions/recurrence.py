@@ -1,9 +1,18 @@
+from collections import defaultdict
+from dataclasses import dataclass
 from datetime import date
+from typing import Iterable, Iterator, NamedTuple
 
+import numpy as np
+from asgiref.sync import sync_to_async
 from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
 
 from ..models import Todo
-from .date import to_date
+from .counters import update_counts
+from .date import RELATIVE_PATTERN, to_date
 
 
 class NoRecurrenceException(Exception):
@@ -24,6 +33,19 @@ def advance_todo(todo: Todo, offset: date | None = None, save: bool = True) -> T
 
     By passing in `save=False` the new todo is only created but not saved to the database.
     """
+    advanced_todo = _next_todo(todo, offset)
+
+    if save:
+        advanced_todo.save()
+
+        advanced_todo.projects.set(todo.projects.all())
+        advanced_todo.contexts.set(todo.contexts.all())
+
+    return advanced_todo
+
+
+def _next_todo(todo: Todo, offset: date | None = None) -> Todo:
+    """Returns the next iteration of a todo as a new, unsaved, todo without projects and contexts (see `advance_todo`)."""
     advanced_todo = Todo(description=todo.description, priority=todo.priority, recurrence=todo.recurrence)
     pattern = todo.recurrence
     strict = False
@@ -49,10 +71,219 @@ def advance_todo(todo: Todo, offset: date | None = None, save: bool = True) -> T
     if todo.start_date:
         advanced_todo.start_date = due_date - relativedelta(days=todo.length)
 
-    if save:
-        advanced_todo.save()
+    return advanced_todo
 
-    advanced_todo.projects.set(todo.projects.all())
-    advanced_todo.contexts.set(todo.contexts.all())
 
-    return advanced_todo
+def complete_todos(todos: QuerySet[Todo], completion_date: date | None = None) -> int:
+    """
+    Marks all open todos in the queryset as completed (default: today) with a single update, todos that are already
+    completed are left as is. The next iterations of the recurring ones are created in bulk in the same transaction,
+    todos completed by other means are picked up by `materialize_recurrences`.
+
+    Returns the number of completed todos.
+    """
+    if completion_date is None:
+        completion_date = timezone.localdate()
+
+    with transaction.atomic():
+        ids = list(todos.filter(completion_date=None).values_list("pk", flat=True))
+        Todo.objects.filter(pk__in=ids).update(completion_date=completion_date, _completed=True, modified=timezone.now())
+
+        update_counts({id: (False, True) for id in ids})
+        _advance_batch(list(Todo.objects.filter(pk__in=ids, advanced=False).exclude(recurrence="")))
+
+    return len(ids)
+
+
+async def acomplete_todos(todos: QuerySet[Todo], completion_date: date | None = None) -> int:
+    """Async version of `complete_todos`, which runs as a whole in a worker thread to keep its transaction."""
+    return await sync_to_async(complete_todos)(todos, completion_date)
+
+
+def materialize_recurrences(batch_size: int = 1000) -> list[Todo]:
+    """
+    Creates the next iteration of every completed recurring todo that has not been advanced yet, following the same
+    rules as `advance_todo` with the completion date as offset.
+
+    Todos are processed in batches of `batch_size`, each batch in its own transaction: one select, one `bulk_create`
+    for the new todos and one per projects/contexts through table. Todos are flagged as `advanced` in the same
+    transaction, so running this again (or after an interruption) never creates an iteration twice.
+
+    Returns the newly created todos.
+    """
+    candidates = Todo.objects.filter(completion_date__isnull=False, advanced=False).exclude(recurrence="").order_by("pk")
+    created = []
+    last_pk = 0
+
+    while batch := list(candidates.filter(pk__gt=last_pk)[:batch_size]):
+        last_pk = batch[-1].pk
+
+        with transaction.atomic():
+            created.extend(_advance_batch(batch))
+
+    return created
+
+
+def _advance_batch(todos: list[Todo]) -> list[Todo]:
+    """Creates the next iterations of the given completed recurring todos in bulk and flags them as `advanced`, returns the new todos."""
+    new_todos = {}
+    advanced = []
+
+    for todo in todos:
+        advanced.append(todo.pk)
+
+        try:
+            new_todos[todo.pk] = _next_todo(todo, todo.completion_date)
+        except NoRecurrenceException:
+            # Nothing will ever be created for this todo
+            continue
+
+    Todo.objects.bulk_create(new_todos.values())
+
+    for field, related_field in [("projects", "project_id"), ("contexts", "context_id")]:
+        through = getattr(Todo, field).through
+        links = through.objects.filter(todo_id__in=list(new_todos)).values_list("todo_id", related_field)
+
+        through.objects.bulk_create([through(**{"todo_id": new_todos[todo_id].pk, related_field: related_id}) for todo_id, related_id in links])
+
+    update_counts({todo.pk: (None, False) for todo in new_todos.values()})
+    Todo.objects.filter(pk__in=advanced, advanced=False).update(advanced=True)
+
+    return list(new_todos.values())
+
+
+class Occurrence(NamedTuple):
+    todo_id: int
+    due_date: date
+    start_date: date
+
+
+@dataclass
+class Forecast:
+    """Future occurrences of recurring todos, stored as NumPy arrays sorted by due date."""
+
+    todo_ids: np.ndarray
+    due_dates: np.ndarray
+    start_dates: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.todo_ids)
+
+    def __iter__(self) -> Iterator[Occurrence]:
+        return map(Occurrence._make, zip(self.todo_ids.tolist(), self.due_dates.tolist(), self.start_dates.tolist()))
+
+
+def forecast(todos: QuerySet[Todo], until: date, today: date | None = None) -> Forecast:
+    """
+    Returns every occurrence of the open recurring todos in the queryset that is due between today and `until`
+    (both included), including the ones that have not been created yet. The todo itself is not included, only
+    the occurrences following it.
+
+    Occurrences are calculated as if every todo is completed on its due date, so strict and non-strict
+    recurrence give the same result. Todos without due date are assumed to be completed today.
+    """
+    rows = todos.filter(completion_date=None).exclude(recurrence="").values_list("id", "recurrence", "due_date", "start_date")
+
+    return forecast_rows(rows, until, today)
+
+
+def forecast_rows(rows: Iterable[tuple[int, str, date | None, date | None]], until: date, today: date | None = None) -> Forecast:
+    """
+    Implementation of `forecast` working on `(id, recurrence, due_date, start_date)` tuples. Todos are grouped
+    per recurrence unit and step, every group is expanded at once with NumPy date arithmetic.
+    """
+    if today is None:
+        today = timezone.localdate()
+
+    groups = defaultdict(lambda: ([], [], []))
+    for id, recurrence, due_date, start_date in rows:
+        relative_pattern = RELATIVE_PATTERN.match(recurrence.removeprefix("+"))
+        if relative_pattern is None or int(relative_pattern.group("length")) <= 0:
+            continue
+
+        base = due_date or today
+        length = (due_date - start_date).days if due_date and start_date and start_date < due_date else 0
+
+        group = groups[relative_pattern.group("period"), int(relative_pattern.group("length"))]
+        group[0].append(id)
+        group[1].append(base)
+        group[2].append(length)
+
+    today, until = np.datetime64(today, "D"), np.datetime64(until, "D")
+    todo_ids, due_dates, lengths = [], [], []
+
+    for (period, step), (ids, bases, base_lengths) in groups.items():
+        bases = np.array(bases, dtype="datetime64[D]")
+
+        match period:
+            case "d" | "w":
+                index, dates = _expand_days(bases, step * 7 if period == "w" else step, today, until)
+            case "b":
+                index, dates = _expand_business_days(bases, step, today, until)
+            case "m" | "y":
+                index, dates = _expand_months(bases, step * 12 if period == "y" else step, today, until)
+            case _:
+                continue
+
+        todo_ids.append(np.array(ids, dtype=np.int64)[index])
+        due_dates.append(dates)
+        lengths.append(np.array(base_lengths, dtype="timedelta64[D]")[index])
+
+    if not todo_ids:
+        return Forecast(np.array([], dtype=np.int64), np.array([], dtype="datetime64[D]"), np.array([], dtype="datetime64[D]"))
+
+    todo_ids, due_dates, lengths = np.concatenate(todo_ids), np.concatenate(due_dates), np.concatenate(lengths)
+    order = np.argsort(due_dates, kind="stable")
+
+    return Forecast(todo_ids[order], due_dates[order], (due_dates - lengths)[order])
+
+
+def _expand(first: np.ndarray, count: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Returns, for every todo, its row index and occurrence numbers `first` up to `first + count - 1` as a matrix with a mask."""
+    count = np.maximum(count, 0)
+    columns = np.arange(count.max(initial=0))
+
+    return first[:, None] + columns[None, :], columns[None, :] < count[:, None]
+
+
+def _expand_days(bases: np.ndarray, step: int, today: np.datetime64, until: np.datetime64) -> tuple[np.ndarray, np.ndarray]:
+    """Occurrence n of a todo recurring every `step` days is due on base + n * step."""
+    first = np.maximum(-((bases - today).astype(np.int64) // step), 1)
+    last = (until - bases).astype(np.int64) // step
+    occurrences, mask = _expand(first, last - first + 1)
+
+    dates = bases[:, None] + occurrences * step
+
+    return np.nonzero(mask)[0], dates[mask]
+
+
+def _expand_business_days(bases: np.ndarray, step: int, today: np.datetime64, until: np.datetime64) -> tuple[np.ndarray, np.ndarray]:
+    """Occurrence n of a todo recurring every `step` business days is n * step business days after base (a weekend base counts from the friday before)."""
+    rolled = np.busday_offset(bases, 0, roll="backward")
+    first = np.maximum(-(-np.busday_count(rolled, today) // step), 1)
+    last = (np.busday_count(rolled, until + 1) - 1) // step
+    occurrences, mask = _expand(first, last - first + 1)
+
+    dates = np.busday_offset(np.broadcast_to(rolled[:, None], occurrences.shape)[mask], occurrences[mask] * step, roll="backward")
+
+    return np.nonzero(mask)[0], dates
+
+
+def _expand_months(bases: np.ndarray, step: int, today: np.datetime64, until: np.datetime64) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Occurrence n of a todo recurring every `step` months falls in month base + n * step. As with relativedelta, the day
+    is clamped to the length of the month and a clamped day carries over to all later occurrences.
+    """
+    months = bases.astype("datetime64[M]")
+    days = (bases - months.astype("datetime64[D]")).astype(np.int64) + 1
+    last = (until.astype("datetime64[M]") - months).astype(np.int64) // step
+    occurrences, mask = _expand(np.ones(len(bases), dtype=np.int64), last)
+
+    occurrence_months = months[:, None] + occurrences * step
+    month_lengths = ((occurrence_months + 1).astype("datetime64[D]") - occurrence_months.astype("datetime64[D]")).astype(np.int64)
+    days = np.minimum(days[:, None], np.minimum.accumulate(month_lengths, axis=1))
+    dates = occurrence_months.astype("datetime64[D]") + (days - 1)
+
+    mask &= (dates >= today) & (dates <= until)
+
+    return np.nonzero(mask)[0], dates[mask]
@@ -0,0 +1,114 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime
+from itertools import islice
+from typing import Iterator, NamedTuple
+
+from django.db.models.query import BaseIterable, ValuesIterable
+
+from ..models import Context, Project, Todo, todo_string
+
+ROW_FIELDS = [
+    "id",
+    "description",
+    "priority",
+    "recurrence",
+    "start_date",
+    "due_date",
+    "completion_date",
+    "created",
+    "modified",
+    "due_date_value",
+    "start_date_value",
+    "due_date_code_value",
+    "annotation_count",
+    "annotation_preview",
+    "last_annotated",
+]
+
+# Rows whose project and context names are fetched together, `iterator()` chunks are split in batches of this size
+NAMES_BATCH_SIZE = 500
+
+
+class Collection(NamedTuple):
+    """Id and name of a project or context, as shown (and linked to) next to a todo."""
+
+    id: int
+    name: str
+
+
+@dataclass(slots=True, frozen=True)
+class TodoRow:
+    """
+    Read-only projection of a todo for the list views, built from `Todo.objects.rows()`: the rendered fields, the due
+    date code computed by the database and the names of its projects and contexts, without a model instance or
+    prefetch caches per todo.
+    """
+
+    id: int
+    description: str
+    priority: str | None
+    recurrence: str
+    start_date: date | None
+    due_date: date | None
+    completion_date: date | None
+    created: datetime
+    modified: datetime
+    due_date_value: date
+    start_date_value: date
+    due_date_code: int
+    annotation_count: int
+    annotation_preview: str
+    last_annotated: datetime | None
+    projects: tuple[Collection, ...] = ()
+    contexts: tuple[Collection, ...] = ()
+
+    @property
+    def is_completed(self) -> bool:
+        return self.completion_date is not None
+
+    @property
+    def is_overdue(self) -> bool:
+        return self.due_date_code == -1
+
+    @property
+    def is_due_soon(self) -> bool:
+        return self.due_date_code in [0, 1]
+
+    @property
+    def has_strict_recurrence(self) -> bool:
+        return self.recurrence.startswith("+")
+
+    def to_string(self) -> str:
+        return todo_string(self, [project.name for project in self.projects], [context.name for context in self.contexts])
+
+
+def collection_names(todo_ids: list[int]) -> tuple[dict[int, tuple[Collection, ...]], dict[int, tuple[Collection, ...]]]:
+    """Returns the projects and contexts of the given todos, sorted by name, with one query per collection type."""
+    names = []
+
+    for model, through, column in [(Project, Todo.projects.through, "project"), (Context, Todo.contexts.through, "context")]:
+        collections = defaultdict(list)
+        links = through.objects.filter(todo_id__in=todo_ids).order_by(column + "__name", column + "_id").values_list("todo_id", column + "_id", column + "__name")
+
+        for todo_id, id, name in links:
+            collections[todo_id].append(Collection(id, name))
+
+        names.append({todo_id: tuple(items) for todo_id, items in collections.items()})
+
+    return names[0], names[1]
+
+
+class TodoRowIterable(BaseIterable):
+    """Yields a `TodoRow` for every row of a `.values(*ROW_FIELDS)` queryset, resolving the names per batch of rows."""
+
+    def __iter__(self) -> Iterator[TodoRow]:
+        values = iter(ValuesIterable(self.queryset, chunked_fetch=self.chunked_fetch, chunk_size=self.chunk_size))
+
+        while batch := list(islice(values, NAMES_BATCH_SIZE)):
+            projects, contexts = collection_names([row["id"] for row in batch])
+
+            for row in batch:
+                row["due_date_code"] = row.pop("due_date_code_value")
+
+                yield TodoRow(**row, projects=projects.get(row["id"], ()), contexts=contexts.get(row["id"], ()))
@@ -0,0 +1,220 @@
+import re
+from typing import NamedTuple
+
+from django.db import connection as default_connection
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import Q, QuerySet
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import SafeString, mark_safe
+
+from ..models import Todo
+
+SEARCH_TABLE = "todoguardian_todo_search"
+
+# Highlight markers, replaced by <mark> tags after the text has been escaped
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+
+class SearchResult(NamedTuple):
+    todo: Todo
+    rank: float
+    highlight: SafeString
+    snippet: SafeString
+
+
+def _mark(text: str) -> SafeString:
+    return mark_safe(escape(text).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>"))
+
+
+def _terms(query: str) -> list[str]:
+    return [term for term in query.split() if term]
+
+
+class SQLiteSearchBackend:
+    """
+    Full-text search using an FTS5 table with one row per todo (rowid = todo id), holding the description and the
+    text of all annotations. The table is kept in sync by triggers on the todo and annotation tables, so bulk
+    inserts and queryset updates are indexed as well. Results are ranked by bm25, description matches weigh more.
+    """
+
+    CREATE_SQL = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(description, annotations, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+        """CREATE TRIGGER IF NOT EXISTS {table}_todo_insert AFTER INSERT ON todoguardian_todo BEGIN
+            INSERT INTO {table}(rowid, description, annotations) VALUES (NEW.id, NEW.description, '');
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS {table}_todo_update AFTER UPDATE OF description ON todoguardian_todo BEGIN
+            UPDATE {table} SET description = NEW.description WHERE rowid = NEW.id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS {table}_todo_delete AFTER DELETE ON todoguardian_todo BEGIN
+            DELETE FROM {table} WHERE rowid = OLD.id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS {table}_annotation_insert AFTER INSERT ON todoguardian_annotation BEGIN
+            UPDATE {table} SET annotations = (SELECT coalesce(group_concat(text, char(10)), '') FROM todoguardian_annotation WHERE todo_id = NEW.todo_id) WHERE rowid = NEW.todo_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS {table}_annotation_update AFTER UPDATE OF text, todo_id ON todoguardian_annotation BEGIN
+            UPDATE {table} SET annotations = (SELECT coalesce(group_concat(text, char(10)), '') FROM todoguardian_annotation WHERE todo_id = OLD.todo_id) WHERE rowid = OLD.todo_id;
+            UPDATE {table} SET annotations = (SELECT coalesce(group_concat(text, char(10)), '') FROM todoguardian_annotation WHERE todo_id = NEW.todo_id) WHERE rowid = NEW.todo_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS {table}_annotation_delete AFTER DELETE ON todoguardian_annotation BEGIN
+            UPDATE {table} SET annotations = (SELECT coalesce(group_concat(text, char(10)), '') FROM todoguardian_annotation WHERE todo_id = OLD.todo_id) WHERE rowid = OLD.todo_id;
+        END""",
+    ]
+
+    DROP_SQL = [
+        "DROP TRIGGER IF EXISTS {table}_todo_insert",
+        "DROP TRIGGER IF EXISTS {table}_todo_update",
+        "DROP TRIGGER IF EXISTS {table}_todo_delete",
+        "DROP TRIGGER IF EXISTS {table}_annotation_insert",
+        "DROP TRIGGER IF EXISTS {table}_annotation_update",
+        "DROP TRIGGER IF EXISTS {table}_annotation_delete",
+        "DROP TABLE IF EXISTS {table}",
+    ]
+
+    REBUILD_SQL = [
+        "DELETE FROM {table}",
+        """INSERT INTO {table}(rowid, description, annotations)
+            SELECT todo.id, todo.description, coalesce((SELECT group_concat(text, char(10)) FROM todoguardian_annotation WHERE todo_id = todo.id), '')
+            FROM todoguardian_todo AS todo""",
+        "INSERT INTO {table}({table}) VALUES ('optimize')",
+    ]
+
+    IDS_SQL = "SELECT rowid FROM {table} WHERE {table} MATCH %s ORDER BY bm25({table}, 10.0, 1.0) LIMIT %s"
+
+    MATCH_SQL = "SELECT rowid FROM {table} WHERE {table} MATCH %s"
+
+    SEARCH_SQL = """
+        SELECT rowid, bm25({table}, 10.0, 1.0) AS rank, highlight({table}, 0, %s, %s), snippet({table}, 1, %s, %s, '…', 16)
+        FROM {table} WHERE {table} MATCH %s ORDER BY rank LIMIT %s
+    """
+
+    def __init__(self, connection: BaseDatabaseWrapper = default_connection):
+        self.connection = connection
+
+    def _execute(self, statements: list[str]) -> None:
+        with self.connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement.format(table=SEARCH_TABLE))
+
+    def install(self) -> None:
+        """Creates the search table and triggers if they do not exist yet. Safe to run repeatedly, e.g. after a migration rebuilt a table (which drops its triggers)."""
+        self._execute(self.CREATE_SQL)
+
+    def uninstall(self) -> None:
+        self._execute(self.DROP_SQL)
+
+    def rebuild(self) -> None:
+        """Refills the search table from the todo and annotation tables."""
+        self._execute(self.REBUILD_SQL)
+
+    @staticmethod
+    def match_expression(query: str) -> str:
+        """Converts user input into an FTS5 expression: every term is quoted (so no FTS5 syntax can leak in), all terms must match and the last one is a prefix."""
+        terms = ['"{term}"'.format(term=term.replace('"', '""')) for term in _terms(query)]
+
+        if terms:
+            terms[-1] += "*"
+
+        return " ".join(terms)
+
+    def search_ids(self, query: str, limit: int = 50) -> list[int]:
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.IDS_SQL.format(table=SEARCH_TABLE), [expression, limit])
+
+            return [row[0] for row in cursor.fetchall()]
+
+    def filter_todos(self, todos: QuerySet[Todo], query: str) -> QuerySet[Todo]:
+        """Restricts the given todos to all that match, with the search as a subquery instead of a list of ids."""
+        expression = self.match_expression(query)
+        if not expression:
+            return todos.none()
+
+        return todos.filter(pk__in=RawSQL(self.MATCH_SQL.format(table=SEARCH_TABLE), [expression]))
+
+    def search(self, query: str, limit: int = 50) -> list[SearchResult]:
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.SEARCH_SQL.format(table=SEARCH_TABLE), [MARK_START, MARK_END, MARK_START, MARK_END, expression, limit])
+            rows = cursor.fetchall()
+
+        todos = Todo.objects.prefetch_related("projects", "contexts").in_bulk([row[0] for row in rows])
+
+        return [SearchResult(todos[id], rank, _mark(highlight), _mark(snippet)) for id, rank, highlight, snippet in rows if id in todos]
+
+
+class DatabaseSearchBackend:
+    """Fallback for databases without FTS5, matching every term against the description and annotations with `icontains`. Results are ordered by last modification."""
+
+    def __init__(self, connection: BaseDatabaseWrapper = default_connection):
+        self.connection = connection
+
+    def install(self) -> None:
+        pass
+
+    def uninstall(self) -> None:
+        pass
+
+    def rebuild(self) -> None:
+        pass
+
+    @staticmethod
+    def _matches(terms: list[str]) -> QuerySet[Todo]:
+        todos = Todo.objects.all()
+        for term in terms:
+            todos = todos.filter(Q(description__icontains=term) | Q(annotations__text__icontains=term))
+
+        return Todo.objects.filter(pk__in=todos.values("pk")).order_by("-modified")
+
+    def search_ids(self, query: str, limit: int = 50) -> list[int]:
+        terms = _terms(query)
+        if not terms:
+            return []
+
+        return list(self._matches(terms).values_list("pk", flat=True)[:limit])
+
+    def filter_todos(self, todos: QuerySet[Todo], query: str) -> QuerySet[Todo]:
+        terms = _terms(query)
+        if not terms:
+            return todos.none()
+
+        return todos.filter(pk__in=self._matches(terms).values("pk"))
+
+    def search(self, query: str, limit: int = 50) -> list[SearchResult]:
+        terms = _terms(query)
+        if not terms:
+            return []
+
+        pattern = re.compile("|".join(re.escape(term) for term in terms), re.I)
+        todos = self._matches(terms).prefetch_related("projects", "contexts", "annotations")[:limit]
+
+        results = []
+        for todo in todos:
+            annotations = "\n".join(annotation.text for annotation in todo.annotations.all() if pattern.search(annotation.text))
+            results.append(SearchResult(todo, 0.0, self._highlight(pattern, todo.description), self._highlight(pattern, annotations)))
+
+        return results
+
+    @staticmethod
+    def _highlight(pattern: re.Pattern, text: str) -> SafeString:
+        return _mark(pattern.sub(lambda match: MARK_START + match.group(0) + MARK_END, text))
+
+
+def get_backend(connection: BaseDatabaseWrapper = default_connection) -> SQLiteSearchBackend | DatabaseSearchBackend:
+    """Returns the search backend for the database, FTS5 on SQLite and the `icontains` fallback on all others."""
+    if connection.vendor == "sqlite":
+        return SQLiteSearchBackend(connection)
+
+    return DatabaseSearchBackend(connection)
+
+
+def search(query: str, limit: int = 50) -> list[SearchResult]:
+    """Searches todo descriptions and annotations, returning the best matches first."""
+    return get_backend().search(query, limit)
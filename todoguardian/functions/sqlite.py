@@ -0,0 +1,17 @@
+from django.db.backends.base.base import BaseDatabaseWrapper
+
+
+def apply_pragmas(connection: BaseDatabaseWrapper, pragmas: dict[str, str | int]) -> None:
+    """
+    Runs `PRAGMA name = value` for every given pragma, in order, on a SQLite connection. Meant to run right after the
+    connection is opened, outside of a transaction, as `journal_mode` cannot be changed inside one.
+    """
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute("PRAGMA {name} = {value}".format(name=name, value=value))
+
+
+def get_pragmas(connection: BaseDatabaseWrapper, names: list[str]) -> dict[str, str | int]:
+    """Returns the current value of the given pragmas."""
+    with connection.cursor() as cursor:
+        return {name: cursor.execute("PRAGMA {name}".format(name=name)).fetchone()[0] for name in names}
@@ -0,0 +1,57 @@
+from itertools import islice
+from typing import AsyncIterator, Iterator
+
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+
+from ..models import TodoQuerySet
+from .fragments import render_todo_fragment
+
+# Todos fetched per query by `iterator()` while streaming, and chunks handed over per thread switch to async views
+STREAM_CHUNK_SIZE = 1000
+
+# Lists of todos in a streamed page and the fragment rendered for each todo, in the order they appear in the page
+STREAM_LISTS = {"cards": "templatetags/show_todo_card.html", "rows": "templatetags/show_todo.html"}
+
+
+def stream_placeholder(name: str) -> str:
+    return "__todoguardian_stream_{name}__".format(name=name)
+
+
+def stream_todos(request: HttpRequest, template_name: str, context: dict, todos: TodoQuerySet) -> Iterator[str]:
+    """
+    Renders a page listing todos as a stream: the page is rendered right away with a placeholder for every list in
+    `STREAM_LISTS` (passed as `stream` in the context), the returned iterator yields the page up to the first
+    placeholder, the fragments of the todos in its place, and so on. Every list reads the todos with
+    `iterator()`, so memory does not depend on the number of todos. As a consequence every list runs its own
+    query: a todo changed while the page is streamed can show its old state in one list and the new one in the
+    next. Fragments are taken from the cache when present, but not added to it, as all todos would not fit.
+
+    Queries and fragments rendered while the response is consumed come after the view returned, so they are not
+    part of the `Server-Timing` header.
+    """
+    page = render_to_string(template_name, {**context, "stream": {name: stream_placeholder(name) for name in STREAM_LISTS}}, request)
+    csrf_token = get_token(request)
+
+    def chunks() -> Iterator[str]:
+        rest = page
+
+        for name, fragment in STREAM_LISTS.items():
+            before, rest = rest.split(stream_placeholder(name), 1)
+            yield before
+
+            for todo in todos.rows().iterator(chunk_size=STREAM_CHUNK_SIZE):
+                yield render_todo_fragment(fragment, todo, csrf_token, store=False)
+
+        yield rest
+
+    return chunks()
+
+
+async def astream(chunks: Iterator[str]) -> AsyncIterator[str]:
+    """Consumes a stream of `stream_todos` from an async view, reading the database in a worker thread `STREAM_CHUNK_SIZE` chunks at a time."""
+    while batch := await sync_to_async(lambda: list(islice(chunks, STREAM_CHUNK_SIZE)))():
+        for chunk in batch:
+            yield chunk
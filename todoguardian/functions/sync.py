@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from ..models import Context, Project, Todo
+from .todotxt import create_todos
+
+# Attribute linking a line of the synced file to its todo
+ID_ATTRIBUTE = "id"
+ID_PATTERN = re.compile(r"(?:^|\s){attribute}:(\d+)(?=\s|$)".format(attribute=ID_ATTRIBUTE))
+
+# Share of the synced todos a single sync may delete without being forced
+MAX_DELETED_SHARE = 0.5
+
+
+class FileChangedException(Exception):
+    pass
+
+
+class MissingFileException(Exception):
+    pass
+
+
+class MassDeletionException(Exception):
+    pass
+
+
+def line_hash(line: str) -> str:
+    return hashlib.md5(line.encode(), usedforsecurity=False).hexdigest()
+
+
+def line_id(line: str) -> int | None:
+    """Returns the todo id stored in a line, None if it has none."""
+    match = ID_PATTERN.search(line)
+
+    return int(match.group(1)) if match else None
+
+
+def strip_id(line: str) -> str:
+    return ID_PATTERN.sub("", line).strip()
+
+
+def render_line(todo: Todo) -> str:
+    """Returns the todo.txt line of a todo as written to the synced file, ending with its id."""
+    return "{line} {attribute}:{id}".format(line=todo.to_string(), attribute=ID_ATTRIBUTE, id=todo.id)
+
+
+def _file_stat(path: Path) -> list[int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def write_atomic(path: Path, content: str) -> None:
+    """Writes a file through a temporary file in the same directory, readers see either the old or the new content."""
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=".{name}.".format(name=path.name))
+
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as temporary_file:
+            temporary_file.write(content)
+            temporary_file.flush()
+            os.fsync(temporary_file.fileno())
+
+        if path.exists():
+            os.chmod(temporary, path.stat().st_mode)
+
+        os.replace(temporary, path)
+
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+@dataclass
+class SyncState:
+    """
+    What both sides agreed on after the last sync: the hash of every line in the file by todo id, the start of the
+    sync (todos modified later have changed in the database) and the modification time and size of the file.
+    """
+
+    hashes: dict[int, str] = field(default_factory=dict)
+    synced_at: datetime | None = None
+    stat: list[int] | None = None
+
+    @classmethod
+    def load(cls, path: Path) -> "SyncState":
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return cls()
+
+        return cls({int(id): hash for id, hash in data["hashes"].items()}, datetime.fromisoformat(data["synced_at"]), data["stat"])
+
+    def save(self, path: Path) -> None:
+        write_atomic(path, json.dumps({"hashes": self.hashes, "synced_at": self.synced_at.isoformat(), "stat": self.stat}))
+
+
+@dataclass
+class SyncResult:
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    written: int = 0
+    removed: int = 0
+
+
+def state_path(path: Path) -> Path:
+    """Returns the default location of the sync state of a todo.txt file, next to it."""
+    return path.with_name(".{name}.sync".format(name=path.name))
+
+
+def needs_sync(path: Path, state: SyncState) -> bool:
+    """Cheap check whether either side changed since the last sync: the file was touched, a todo was modified or the number of todos changed."""
+    if state.synced_at is None or _file_stat(path) != state.stat:
+        return True
+
+    return Todo.objects.filter(modified__gt=state.synced_at).exists() or Todo.objects.count() != len(state.hashes)
+
+
+def sync_file(path: Path, state: SyncState, force: bool = False) -> SyncResult:
+    """
+    Synchronizes a todo.txt file with the database in both directions, every line carries the id of its todo in an
+    `id:` attribute. Changes are detected per line and per todo, so editing one line of a large file costs a single
+    `update_from_string`:
+
+    * File side: lines whose hash differs from the one stored in `state` were edited, lines without id were added
+      and ids missing from the file were deleted.
+    * Database side: only todos modified since the last sync are rendered and compared, todos missing from the
+      database were deleted.
+
+    A line edited on both sides keeps the version from the file. Lines applied from the file are rewritten in their
+    canonical form (e.g. with relative dates resolved), the file is only rewritten if a line changed, atomically
+    and inside the database transaction: if the file was changed by another program in the meantime nothing is
+    applied and `FileChangedException` is raised.
+
+    As a missing file or a mostly emptied one is more likely a mistake (a moved file, an editor replacing it, a
+    missing mount) than a wish to delete every todo, nothing is applied in these cases unless `force` is set:
+
+    * `MissingFileException` is raised when the file does not exist (anymore) after an earlier sync.
+    * `MassDeletionException` is raised when more than one todo and more than `MAX_DELETED_SHARE` of the synced
+      todos would be deleted.
+
+    Updates `state` in place, the caller saves it.
+    """
+    started = timezone.now()
+    result = SyncResult()
+    stat = _file_stat(path)
+
+    if stat is None and state.hashes and not force:
+        raise MissingFileException("{path} does not exist anymore, not deleting its {count} todos".format(path=path, count=len(state.hashes)))
+
+    lines = [line.strip() for line in path.read_text(encoding="utf-8").splitlines()] if stat is not None else []
+    lines = [line for line in lines if line != ""]
+
+    # Split the file into lines linked to a todo and new lines, a duplicated id is a new line
+    entries = []
+    seen = set()
+    for line in lines:
+        id = line_id(line)
+
+        if id in seen:
+            id, line = None, strip_id(line)
+
+        if id is not None:
+            seen.add(id)
+
+        entries.append([id, line])
+
+    database_ids = set(Todo.objects.values_list("id", flat=True))
+    todos = Todo.objects.prefetch_related(Prefetch("projects", queryset=Project.objects.only("name")), Prefetch("contexts", queryset=Context.objects.only("name")))
+    changed_todos = todos.all() if state.synced_at is None else todos.filter(modified__gt=state.synced_at)
+    rendered = {todo.id: render_line(todo) for todo in changed_todos}
+
+    with transaction.atomic():
+        new_entries = []
+        updated = []
+
+        for entry in entries:
+            id, line = entry
+
+            if id is None or id not in database_ids:
+                # Added to the file, or a line left over from a todo deleted from the database
+                if id is not None and state.hashes.get(id) == line_hash(line):
+                    entry[1] = None
+                    result.removed += 1
+                else:
+                    new_entries.append(entry)
+
+            elif state.hashes.get(id) != line_hash(line) and rendered.get(id) != line:
+                updated.append(entry)
+
+            elif id in rendered and rendered[id] != line:
+                entry[1] = rendered[id]
+                result.written += 1
+
+        for entry, todo in zip(new_entries, create_todos([strip_id(line) for _, line in new_entries])):
+            entry[0] = todo.id
+        result.created = len(new_entries)
+
+        for entry in updated:
+            todo = Todo.objects.get(pk=entry[0])
+            todo.update_from_string(strip_id(entry[1]))
+        result.updated = len(updated)
+
+        # Rewrite changed lines in their canonical form
+        for todo in todos.filter(pk__in=[entry[0] for entry in new_entries + updated]):
+            rendered[todo.id] = render_line(todo)
+        for entry in new_entries + updated:
+            entry[1] = rendered[entry[0]]
+
+        # Todos removed from the file are deleted, unless they changed in the database since
+        file_ids = {entry[0] for entry in entries if entry[1] is not None}
+        deleted = [id for id in state.hashes if id not in file_ids and id in database_ids and id not in rendered]
+        if len(deleted) > max(1, MAX_DELETED_SHARE * len(state.hashes)) and not force:
+            raise MassDeletionException("{path} would delete {count} of {total} todos".format(path=path, count=len(deleted), total=len(state.hashes)))
+
+        result.deleted = Todo.objects.filter(pk__in=deleted).delete()[1].get(Todo._meta.label, 0)
+
+        # Todos that are new in the database (or changed after being removed from the file) are appended
+        appended = [[id, line] for id, line in rendered.items() if id not in file_ids and id in database_ids]
+        result.written += len(appended)
+
+        content = [line for _, line in entries if line is not None] + [line for _, line in appended]
+
+        if content != lines:
+            if _file_stat(path) != stat:
+                raise FileChangedException("{path} was changed during the sync".format(path=path))
+
+            write_atomic(path, "".join(line + "\n" for line in content))
+
+    state.hashes = {id: line_hash(line) for id, line in entries + appended if line is not None}
+    state.synced_at = started
+    state.stat = _file_stat(path)
+
+    return result
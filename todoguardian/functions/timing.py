@@ -0,0 +1,83 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.http import HttpRequest
+from django.template.backends import django as django_backend
+from django.utils.safestring import SafeString
+
+
+@dataclass
+class RequestTimings:
+    """Time spent on a request, in seconds. Filled in by `todoguardian.middleware.ServerTimingMiddleware` and its hooks."""
+
+    queries: int = 0
+    db: float = 0.0
+    template: float = 0.0
+    view: float = 0.0
+
+    def server_timing(self) -> str:
+        """Returns the value of a `Server-Timing` header, durations in milliseconds."""
+        return 'db;dur={db:.1f};desc="{queries} queries", tpl;dur={template:.1f}, view;dur={view:.1f}'.format(queries=self.queries, db=self.db * 1000, template=self.template * 1000, view=self.view * 1000)
+
+
+# Timings of the request being handled, contexts are copied into the threads running sync code for async requests
+current_timings: ContextVar[RequestTimings | None] = ContextVar("current_timings", default=None)
+
+
+def record_query(execute: Callable, sql: str, params: Any, many: bool, context: dict) -> Any:
+    """Database execute wrapper adding every query and its duration to the timings of the current request."""
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db += time.perf_counter() - start
+
+
+def install_query_recorder(connection: BaseDatabaseWrapper) -> None:
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def query_budget(queries: int) -> Callable:
+    """
+    Declares the maximum number of queries a view may run, whatever the number of todos. Requests over budget are
+    logged as a warning by the middleware and the budgets are checked by the tests.
+    """
+
+    def decorator(view: Callable) -> Callable:
+        view.query_budget = queries
+
+        return view
+
+    return decorator
+
+
+class Template(django_backend.Template):
+    def render(self, context: dict | None = None, request: HttpRequest | None = None) -> SafeString:
+        timings = current_timings.get()
+        if timings is None:
+            return super().render(context, request)
+
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template += time.perf_counter() - start
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Django template backend adding the render time of every template to the timings of the current request (includes are part of their parent)."""
+
+    def from_string(self, template_code: str) -> Template:
+        return Template(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name: str) -> Template:
+        return Template(super().get_template(template_name).template, self)
@@ -0,0 +1,184 @@
+import hashlib
+import re
+from collections import defaultdict
+from itertools import islice
+from typing import Iterable, Iterator
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch, Q, QuerySet, Value
+from django.db.models.functions import Lower
+from pytodotxt import Task
+
+from ..models import Context, Project, Todo
+from .counters import add_counts
+
+EXPORT_STATUSES = ["open", "completed", "all"]
+NAME_TIMEOUT = 60 * 60 * 24
+
+
+def normalize_name(name: str) -> str:
+    """Converts a todo.txt project or context name (using - instead of spaces) into the name stored in the database."""
+    return re.sub(r"-+", " ", name)
+
+
+def _batched(lines: Iterable[str], batch_size: int) -> Iterator[list[str]]:
+    """Yields lists of at most `batch_size` non-empty lines, without reading ahead further than one batch."""
+    lines = (line.strip() for line in lines)
+    lines = (line for line in lines if line != "")
+
+    while batch := list(islice(lines, batch_size)):
+        yield batch
+
+
+def name_key(model: type[Project] | type[Context], name: str) -> str:
+    """Returns the cache key of a project or context name, names only differing in case share a key."""
+    digest = hashlib.md5(name.lower().encode(), usedforsecurity=False).hexdigest()
+
+    return "todoguardian:name:{model}:{digest}".format(model=model._meta.model_name, digest=digest)
+
+
+def _name_rows(model: type[Project] | type[Context], query: Q) -> dict[int, str]:
+    return dict(model.objects.annotate(folded=Lower("name")).filter(query).order_by().values_list("id", "name"))
+
+
+def _folded(names: Iterable[str]) -> Q:
+    # Lowered by the database, as in the unique constraint (whose index is used), names sharing it are the same name
+    return Q(folded__in=[Lower(Value(name)) for name in names])
+
+
+def _match(name: str, rows: dict[int, str]) -> int | None:
+    """Returns the id of the row holding the given name, preferring an exact match over one differing in case."""
+    return next((id for id, stored in rows.items() if stored == name), None) or next((id for id, stored in rows.items() if stored.lower() == name.lower()), None)
+
+
+def resolve_names(model: type[Project] | type[Context], names: set[str]) -> dict[str, int]:
+    """
+    Returns a name -> id map for the given (normalized) names, creating the ones that do not exist yet. Names are
+    unique regardless of case, so a name matches an existing one written with different capitals.
+
+    The cache keeps the stored name and id of every resolved name. That cache may be local to the process (the
+    default) and projects and contexts can be renamed or deleted without signals (e.g. by `QuerySet.update`), so
+    cached entries are only hints: they are checked against the database by primary key, in the same query that
+    looks up the other names. Names that are not found are inserted with `ignore_conflicts` (so a name created
+    concurrently by another request is reused instead of being duplicated) and read back.
+    """
+    if not names:
+        return {}
+
+    keys = {name: name_key(model, name) for name in names}
+    cached = cache.get_many(keys.values())
+    hints = {name: cached[key] for name, key in keys.items() if key in cached}
+
+    rows = {}
+    name_map = {}
+    if hints:
+        rows = _name_rows(model, Q(pk__in=[id for _, id in hints.values()]) | _folded(name for name in names if name not in hints))
+        name_map = {name: id for name, (stored, id) in hints.items() if rows.get(id) == stored}
+        name_map.update({name: id for name in names if name not in hints and (id := _match(name, rows)) is not None})
+
+    missing = [name for name in names if name not in name_map]
+    if missing:
+        model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+        rows.update(_name_rows(model, _folded(missing)))
+        name_map.update({name: _match(name, rows) for name in missing})
+
+    transaction.on_commit(lambda: cache.set_many({keys[name]: (rows[id], id) for name, id in name_map.items()}, NAME_TIMEOUT))
+
+    return name_map
+
+
+def link_todos(todos: list[Todo], todo_projects: list[list[str]], todo_contexts: list[list[str]]) -> None:
+    """
+    Links saved todos to their (normalized) project and context names, with one insert per through table and one
+    counter update per collection type. The todos must not be linked to any of these names yet.
+    """
+    for model, through, column, todo_names in [(Project, Todo.projects.through, "project_id", todo_projects), (Context, Todo.contexts.through, "context_id", todo_contexts)]:
+        name_map = resolve_names(model, {name for names in todo_names for name in names})
+        links = [(todo, collection_id) for todo, names in zip(todos, todo_names) for collection_id in {name_map[name] for name in names}]
+
+        through.objects.bulk_create([through(**{"todo_id": todo.id, column: collection_id}) for todo, collection_id in links])
+
+        deltas = defaultdict(lambda: [0, 0])
+        for todo, collection_id in links:
+            deltas[collection_id][todo.is_completed] += 1
+
+        add_counts(model, deltas)
+
+
+def task_names(task: Task) -> tuple[list[str], list[str]]:
+    """Returns the normalized project and context names of a parsed todo.txt task."""
+    return [normalize_name(project) for project in task.projects], [normalize_name(context) for context in task.contexts]
+
+
+def create_todos(lines: list[str]) -> list[Todo]:
+    """Parses and inserts todo.txt lines with a single `bulk_create`, returns the created todos."""
+    todos = []
+    todo_projects = []
+    todo_contexts = []
+
+    for line in lines:
+        task = Task(line)
+
+        todo = Todo()
+        todo.set_fields_from_task(task)
+
+        # Todos that are completed on import are history, their next iteration is not created
+        todo.advanced = todo.is_completed
+
+        projects, contexts = task_names(task)
+        todos.append(todo)
+        todo_projects.append(projects)
+        todo_contexts.append(contexts)
+
+    Todo.objects.bulk_create(todos)
+    link_todos(todos, todo_projects, todo_contexts)
+
+    return todos
+
+
+def import_todos(lines: Iterable[str], batch_size: int = 1000) -> Iterator[int]:
+    """
+    Imports todo.txt (or done.txt) lines into the database. Lines are consumed lazily and written in
+    batches of `batch_size` using `bulk_create`, each batch in its own transaction.
+
+    Project and context names are resolved once per batch, missing ones are created in bulk.
+
+    Yields the number of todos created after every batch, so callers can report progress.
+    """
+    for batch in _batched(lines, batch_size):
+        with transaction.atomic():
+            created = create_todos(batch)
+
+        yield len(created)
+
+
+def export_queryset(status: str = "all") -> QuerySet[Todo]:
+    """Returns the todos to export for the given status (`open`, `completed` or `all`)."""
+    todos = Todo.objects.order_by("id")
+
+    match status:
+        case "open":
+            todos = todos.filter(completion_date=None)
+        case "completed":
+            todos = todos.filter(completion_date__isnull=False)
+        case _:
+            pass
+
+    return todos
+
+
+def export_todos(todos: QuerySet[Todo], chunk_size: int = 1000) -> Iterator[str]:
+    """
+    Yields every todo in the queryset as a todo.txt line (including the trailing newline).
+
+    The queryset is read with `iterator(chunk_size=...)`, project and context names are prefetched per
+    chunk, so memory stays flat and the number of queries only depends on the number of chunks.
+    """
+    todos = todos.prefetch_related(
+        Prefetch("projects", queryset=Project.objects.only("name")),
+        Prefetch("contexts", queryset=Context.objects.only("name")),
+    )
+
+    for todo in todos.iterator(chunk_size=chunk_size):
+        yield todo.to_string() + "\n"
@@ -0,0 +1,26 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from ...functions.todotxt import EXPORT_STATUSES, export_queryset, export_todos
+
+
+class Command(BaseCommand):
+    help = "Exports todos as todo.txt lines, streaming them from the database in chunks."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("file", type=Path, nargs="?", help="Path of the file to write (default: stdout)")
+        parser.add_argument("--status", choices=EXPORT_STATUSES, default="all", help="Which todos to export (default: all)")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Number of todos read from the database per chunk (default: 1000)")
+
+    def handle(self, *args, **options) -> None:
+        lines = export_todos(export_queryset(options["status"]), chunk_size=options["chunk_size"])
+
+        if options["file"] is None:
+            for line in lines:
+                self.stdout.write(line, ending="")
+
+            return
+
+        with options["file"].open("w", encoding="utf-8") as todo_file:
+            todo_file.writelines(lines)
@@ -0,0 +1,30 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from ...functions.todotxt import import_todos
+
+
+class Command(BaseCommand):
+    help = "Imports todos from a todo.txt or done.txt file, streaming the file and inserting todos in batches."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("file", type=Path, help="Path to the todo.txt or done.txt file")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Number of lines inserted per batch (default: 1000)")
+
+    def handle(self, *args, **options) -> None:
+        start = time.perf_counter()
+        total = 0
+
+        with options["file"].open(encoding="utf-8") as todo_file:
+            for created in import_todos(todo_file, batch_size=options["batch_size"]):
+                total += created
+
+                if options["verbosity"] > 1:
+                    self.stdout.write("{total} todos imported".format(total=total))
+
+        duration = time.perf_counter() - start
+        rate = total / duration if duration > 0 else total
+
+        self.stdout.write(self.style.SUCCESS("Imported {total} todos in {duration:.2f}s ({rate:.0f} rows/s)".format(total=total, duration=duration, rate=rate)))
@@ -0,0 +1,32 @@
+import fcntl
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from ...functions.recurrence import materialize_recurrences
+
+
+class Command(BaseCommand):
+    help = "Creates the next iterations of completed recurring todos, once or continuously as a worker. Only one instance runs at a time."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000, help="Number of todos processed per transaction (default: %(default)s)")
+        parser.add_argument("--loop", action="store_true", help="Keep running, materializing every --interval seconds")
+        parser.add_argument("--interval", type=int, default=60, help="Seconds between runs with --loop (default: %(default)s)")
+
+    def handle(self, *args, **options) -> None:
+        with open(settings.TODOGUARDIAN_RECURRENCE_LOCK_FILE, "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise CommandError("Another materializer is already running (lock: {path})".format(path=settings.TODOGUARDIAN_RECURRENCE_LOCK_FILE))
+
+            while True:
+                created = materialize_recurrences(batch_size=options["batch_size"])
+                self.stdout.write("Created {count} recurring todos".format(count=len(created)))
+
+                if not options["loop"]:
+                    break
+
+                time.sleep(options["interval"])
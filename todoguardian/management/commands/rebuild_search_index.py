@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...functions.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index from all todos and annotations."
+
+    def handle(self, *args, **options) -> None:
+        backend = get_backend()
+
+        with transaction.atomic():
+            backend.install()
+            backend.rebuild()
+
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt"))
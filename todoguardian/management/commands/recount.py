@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...functions.counters import recount, update_annotation_summaries
+from ...models import Context, Project
+
+
+class Command(BaseCommand):
+    help = "Recalculates the open and completed todo counters of all projects and contexts, and the annotation summaries of all todos."
+
+    def handle(self, *args, **options) -> None:
+        with transaction.atomic():
+            projects = recount(Project)
+            contexts = recount(Context)
+            todos = update_annotation_summaries()
+
+        self.stdout.write(self.style.SUCCESS("Recounted {projects} projects, {contexts} contexts and {todos} todos".format(projects=projects, contexts=contexts, todos=todos)))
@@ -0,0 +1,49 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from ...functions.sync import FileChangedException, MassDeletionException, MissingFileException, SyncResult, SyncState, needs_sync, state_path, sync_file
+
+
+class Command(BaseCommand):
+    help = "Synchronizes a todo.txt file with the database in both directions, once or continuously with --watch."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("file", type=Path, help="Path of the todo.txt file, created if it does not exist")
+        parser.add_argument("--state", type=Path, help="Path of the sync state (default: .<file>.sync next to the file)")
+        parser.add_argument("--watch", action="store_true", help="Keep running, checking both sides for changes every --interval seconds")
+        parser.add_argument("--interval", type=float, default=2, help="Seconds between checks with --watch, and before retrying a sync (default: %(default)s)")
+        parser.add_argument("--retries", type=int, default=5, help="Attempts of a sync interrupted by changes to the file before giving up (default: %(default)s)")
+        parser.add_argument("--force", action="store_true", help="Apply the sync even if the file is missing or most todos would be deleted")
+
+    def handle(self, *args, **options) -> None:
+        path = options["file"]
+        state_file = options["state"] or state_path(path)
+        state = SyncState.load(state_file)
+
+        while True:
+            if needs_sync(path, state):
+                result = self.sync(path, state, options)
+
+                state.save(state_file)
+                self.stdout.write("Database: {r.created} created, {r.updated} updated, {r.deleted} deleted. File: {r.written} lines written, {r.removed} removed".format(r=result))
+
+            if not options["watch"]:
+                break
+
+            time.sleep(options["interval"])
+
+    def sync(self, path: Path, state: SyncState, options: dict) -> SyncResult:
+        """Runs a sync, retrying after --interval seconds while the file keeps changing during it."""
+        for attempt in range(1, max(options["retries"], 1) + 1):
+            try:
+                return sync_file(path, state, force=options["force"])
+            except (MissingFileException, MassDeletionException) as exception:
+                raise CommandError("{exception}, use --force to sync anyway".format(exception=exception))
+            except FileChangedException as exception:
+                if attempt >= options["retries"]:
+                    raise CommandError("{exception}, giving up after {attempts} attempts".format(exception=exception, attempts=attempt))
+
+                self.stderr.write("{exception}, retrying".format(exception=exception))
+                time.sleep(options["interval"])
@@ -0,0 +1,82 @@
+import logging
+import time
+from typing import Callable
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpRequest, HttpResponse
+
+from .functions.timing import RequestTimings, current_timings
+
+logger = logging.getLogger(__name__)
+
+
+class ServerTimingMiddleware:
+    """
+    Records the number of queries, the database and template time and the total time of every request, adds them
+    to the response as a `Server-Timing` header and logs them as a single `key=value` line. Requests running more
+    queries than the `query_budget` of their view are logged as a warning. Place it first so the queries of the
+    other middleware are counted as well.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable):
+        self.get_response = get_response
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+
+        try:
+            response = self.get_response(request)
+        finally:
+            timings.view = time.perf_counter() - start
+            current_timings.reset(token)
+
+        return self.report(request, response, timings)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings.view = time.perf_counter() - start
+            current_timings.reset(token)
+
+        return self.report(request, response, timings)
+
+    def report(self, request: HttpRequest, response: HttpResponse, timings: RequestTimings) -> HttpResponse:
+        response["Server-Timing"] = timings.server_timing()
+
+        match = request.resolver_match
+        budget = getattr(match.func, "query_budget", None) if match is not None else None
+
+        line = "method={method} path={path} view={view} status={status} queries={queries} budget={budget} db_ms={db:.1f} template_ms={template:.1f} view_ms={view_ms:.1f}".format(
+            method=request.method,
+            path=request.path,
+            view=match.view_name if match is not None else "-",
+            status=response.status_code,
+            queries=timings.queries,
+            budget=budget if budget is not None else "-",
+            db=timings.db * 1000,
+            template=timings.template * 1000,
+            view_ms=timings.view * 1000,
+        )
+
+        if budget is not None and timings.queries > budget:
+            logger.warning("Query budget exceeded: " + line)
+        else:
+            logger.info(line)
+
+        return response
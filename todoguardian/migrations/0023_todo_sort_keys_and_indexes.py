@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:02
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todoguardian", "0022_alter_todo_priority"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="todo",
+            name="due_date_value",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.functions.comparison.Coalesce(
+                    "due_date", models.Value("9999-12-31")
+                ),
+                output_field=models.DateField(),
+            ),
+        ),
+        migrations.AddField(
+            model_name="todo",
+            name="start_date_value",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.functions.comparison.Coalesce(
+                    "start_date", models.Value("9999-12-31")
+                ),
+                output_field=models.DateField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(
+                condition=models.Q(("completion_date__isnull", True)),
+                fields=["due_date_value", "start_date_value", "priority"],
+                name="todo_open_sort_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(
+                condition=models.Q(("completion_date__isnull", False)),
+                fields=["due_date_value", "start_date_value", "priority"],
+                name="todo_completed_sort_idx",
+            ),
+        ),
+    ]
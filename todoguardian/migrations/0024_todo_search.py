@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# Full-text search table and the triggers keeping it in sync, as of this migration (only on SQLite, other databases
+# search with `icontains`). Later changes to the triggers are installed by the post_migrate handler.
+INSTALL_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS todoguardian_todo_search USING fts5(description, annotations, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    """CREATE TRIGGER IF NOT EXISTS todoguardian_todo_search_todo_insert AFTER INSERT ON todoguardian_todo BEGIN
+        INSERT INTO todoguardian_todo_search(rowid, description, annotations) VALUES (NEW.id, NEW.description, '');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS todoguardian_todo_search_todo_update AFTER UPDATE OF description ON todoguardian_todo BEGIN
+        UPDATE todoguardian_todo_search SET description = NEW.description WHERE rowid = NEW.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS todoguardian_todo_search_todo_delete AFTER DELETE ON todoguardian_todo BEGIN
+        DELETE FROM todoguardian_todo_search WHERE rowid = OLD.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS todoguardian_todo_search_annotation_insert AFTER INSERT ON todoguardian_annotation BEGIN
+        UPDATE todoguardian_todo_search SET annotations = (SELECT coalesce(group_concat(text, char(10)), '') FROM todoguardian_annotation WHERE todo_id = NEW.todo_id) WHERE rowid = NEW.todo_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS todoguardian_todo_search_annotation_update AFTER UPDATE OF text, todo_id ON todoguardian_annotation BEGIN
+        UPDATE todoguardian_todo_search SET annotations = (SELECT coalesce(group_concat(text, char(10)), '') FROM todoguardian_annotation WHERE todo_id = OLD.todo_id) WHERE rowid = OLD.todo_id;
+        UPDATE todoguardian_todo_search SET annotations = (SELECT coalesce(group_concat(text, char(10)), '') FROM todoguardian_annotation WHERE todo_id = NEW.todo_id) WHERE rowid = NEW.todo_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS todoguardian_todo_search_annotation_delete AFTER DELETE ON todoguardian_annotation BEGIN
+        UPDATE todoguardian_todo_search SET annotations = (SELECT coalesce(group_concat(text, char(10)), '') FROM todoguardian_annotation WHERE todo_id = OLD.todo_id) WHERE rowid = OLD.todo_id;
+    END""",
+    "DELETE FROM todoguardian_todo_search",
+    """INSERT INTO todoguardian_todo_search(rowid, description, annotations)
+        SELECT todo.id, todo.description, coalesce((SELECT group_concat(text, char(10)) FROM todoguardian_annotation WHERE todo_id = todo.id), '')
+        FROM todoguardian_todo AS todo""",
+    "INSERT INTO todoguardian_todo_search(todoguardian_todo_search) VALUES ('optimize')",
+]
+
+UNINSTALL_SQL = [
+    "DROP TRIGGER IF EXISTS todoguardian_todo_search_todo_insert",
+    "DROP TRIGGER IF EXISTS todoguardian_todo_search_todo_update",
+    "DROP TRIGGER IF EXISTS todoguardian_todo_search_todo_delete",
+    "DROP TRIGGER IF EXISTS todoguardian_todo_search_annotation_insert",
+    "DROP TRIGGER IF EXISTS todoguardian_todo_search_annotation_update",
+    "DROP TRIGGER IF EXISTS todoguardian_todo_search_annotation_delete",
+    "DROP TABLE IF EXISTS todoguardian_todo_search",
+]
+
+
+def execute(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == "sqlite":
+            for statement in statements:
+                schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todoguardian", "0023_todo_sort_keys_and_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(execute(INSTALL_SQL), execute(UNINSTALL_SQL)),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Todo = apps.get_model("todoguardian", "Todo")
+
+    for model_name, field, column in [
+        ("Project", "projects", "project_id"),
+        ("Context", "contexts", "context_id"),
+    ]:
+        model = apps.get_model("todoguardian", model_name)
+        through = getattr(Todo, field).through
+
+        def count(completed):
+            links = (
+                through.objects.filter(
+                    Q(**{column: OuterRef("pk")}),
+                    todo__completion_date__isnull=not completed,
+                )
+                .order_by()
+                .values(column)
+                .annotate(count=Count("*"))
+                .values("count")
+            )
+
+            return Coalesce(Subquery(links), Value(0))
+
+        model.objects.update(open_count=count(False), completed_count=count(True))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todoguardian", "0025_modified_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="context",
+            name="completed_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="context",
+            name="open_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="completed_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="open_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:21
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+
+def fill_summaries(apps, schema_editor):
+    Todo = apps.get_model("todoguardian", "Todo")
+    Annotation = apps.get_model("todoguardian", "Annotation")
+
+    annotations = Annotation.objects.filter(todo_id=OuterRef("pk")).order_by()
+    latest = Annotation.objects.filter(todo_id=OuterRef("pk")).order_by(
+        "-created", "-id"
+    )
+
+    Todo.objects.update(
+        annotation_count=Coalesce(
+            Subquery(
+                annotations.values("todo_id").annotate(count=Count("*")).values("count")
+            ),
+            Value(0),
+        ),
+        last_annotated=Subquery(latest.values("created")[:1]),
+        annotation_preview=Coalesce(
+            Subquery(latest.values(preview=Substr("text", 1, 100))[:1]),
+            Value(""),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todoguardian", "0026_collection_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="todo",
+            name="annotation_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="todo",
+            name="annotation_preview",
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name="todo",
+            name="last_annotated",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:23
+
+from django.db import migrations, models
+
+
+def advance_completed(apps, schema_editor):
+    # Completed todos already had their next iteration created when they were completed
+    Todo = apps.get_model("todoguardian", "Todo")
+    Todo.objects.filter(completion_date__isnull=False).update(advanced=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todoguardian", "0027_annotation_summary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="todo",
+            name="advanced",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                help_text="Set once the next iteration of a completed recurring todo has been created.",
+            ),
+        ),
+        migrations.RunPython(advance_completed, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(
+                condition=models.Q(
+                    ("advanced", False),
+                    ("completion_date__isnull", False),
+                    models.Q(("recurrence", ""), _negated=True),
+                ),
+                fields=["id"],
+                name="todo_to_advance_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:49
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Lower
+
+
+def merge_duplicates(apps, schema_editor):
+    # Names only differing in case become one project or context (the oldest), keeping the links of all of them
+    Todo = apps.get_model("todoguardian", "Todo")
+
+    for model_name, field, column in [
+        ("Project", "projects", "project_id"),
+        ("Context", "contexts", "context_id"),
+    ]:
+        model = apps.get_model("todoguardian", model_name)
+        through = getattr(Todo, field).through
+        kept = {}
+        merged = set()
+
+        for id, folded in (
+            model.objects.annotate(folded=Lower("name"))
+            .order_by("id")
+            .values_list("id", "folded")
+        ):
+            if folded not in kept:
+                kept[folded] = id
+                continue
+
+            linked = through.objects.filter(**{column: kept[folded]}).values_list(
+                "todo_id", flat=True
+            )
+            through.objects.filter(**{column: id}).exclude(todo_id__in=linked).update(
+                **{column: kept[folded]}
+            )
+            model.objects.filter(id=id).delete()
+            merged.add(kept[folded])
+
+        def count(completed):
+            links = (
+                through.objects.filter(
+                    Q(**{column: OuterRef("pk")}),
+                    todo__completion_date__isnull=not completed,
+                )
+                .order_by()
+                .values(column)
+                .annotate(count=Count("*"))
+                .values("count")
+            )
+
+            return Coalesce(Subquery(links), Value(0))
+
+        if merged:
+            model.objects.filter(pk__in=merged).update(
+                open_count=count(False), completed_count=count(True)
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("todoguardian", "0028_todo_advanced"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="context",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("name"),
+                name="context_name_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="project",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("name"),
+                name="project_name_unique",
+            ),
+        ),
+    ]
@@ -1,35 +1,76 @@
-import re
 import string
 from datetime import date
 
+from asgiref.sync import sync_to_async
 from dateutil.relativedelta import relativedelta
-from django.db import models
+from django.db import DatabaseError, models, transaction
+from django.db.models.functions import Coalesce, Lower
 from django.utils import text, timezone
 from pytodotxt import Task
 
 from .functions.date import to_date
 
+DUE_DATE_FILTERS = {"past": -1, "today": 0, "soon": 1, "later": 2, "none": 3}
+
+
+def _percent_completed(instance: "Project | Context") -> float:
+    """Returns the percentage of completed todos for a project or context, based on the stored counters."""
+    total_todos = instance.open_count + instance.completed_count
+
+    if total_todos > 0:
+        return instance.completed_count / total_todos * 100
+
+    return 100
+
+
+def todo_string(todo: "Todo", projects: list[str], contexts: list[str]) -> str:
+    """Returns the todo.txt compliant string of a todo with the given project and context names, also used for `TodoRow` objects."""
+    task = Task(todo.description)
+
+    task.priority = todo.priority
+    task.is_completed = todo.is_completed
+    task.completion_date = todo.completion_date
+    task.creation_date = todo.created.date()
+
+    if todo.due_date is not None:
+        task.add_attribute("due", todo.due_date.isoformat())
+
+    if todo.start_date is not None:
+        task.add_attribute("t", todo.start_date.isoformat())
+
+    if todo.recurrence is not None and todo.recurrence != "":
+        task.add_attribute("rec", todo.recurrence)
+
+    for project in projects:
+        task.add_project(project.replace(" ", "-"))
+
+    for context in contexts:
+        task.add_context(context.replace(" ", "-"))
+
+    return str(task)
+
 
 class Project(models.Model):
     """A project can be any type of collection of todos"""
 
     name = models.CharField(max_length=250)
 
+    # Number of linked todos, kept up to date by `functions.counters` (repair with the recount command)
+    open_count = models.IntegerField(default=0, editable=False)
+    completed_count = models.IntegerField(default=0, editable=False)
+
     def __str__(self):
         return self.name
 
     class Meta:
         ordering = ["name"]
+        constraints = [
+            models.UniqueConstraint(Lower("name"), name="project_name_unique"),
+        ]
 
     @property
     def percent_completed(self) -> float:
-        total_todos = self.todos.count()
-        total_pending_todos = self.todos.filter(completion_date=None).count()
-
-        if total_todos > 0:
-            return (total_todos - total_pending_todos) / total_todos * 100
-
-        return 100
+        return _percent_completed(self)
 
 
 class Context(models.Model):
@@ -37,21 +78,70 @@ class Context(models.Model):
 
     name = models.CharField(max_length=250)
 
+    # Number of linked todos, kept up to date by `functions.counters` (repair with the recount command)
+    open_count = models.IntegerField(default=0, editable=False)
+    completed_count = models.IntegerField(default=0, editable=False)
+
     def __str__(self):
         return self.name
 
     class Meta:
         ordering = ["name"]
+        constraints = [
+            models.UniqueConstraint(Lower("name"), name="context_name_unique"),
+        ]
 
     @property
     def percent_completed(self) -> float:
-        total_todos = self.todos.count()
-        total_pending_todos = self.todos.filter(completion_date=None).count()
+        return _percent_completed(self)
 
-        if total_todos > 0:
-            return (total_todos - total_pending_todos) / total_todos * 100
 
-        return 100
+class TodoQuerySet(models.QuerySet):
+    def with_due_date_code(self, today: date | None = None) -> "TodoQuerySet":
+        """
+        Annotates every todo with `due_date_code_value`, the database-side equivalent of `Todo.due_date_code`.
+        The date used as today is resolved once (default: `timezone.localdate()`).
+        """
+        if today is None:
+            today = timezone.localdate()
+
+        return self.annotate(
+            due_date_code_value=models.Case(
+                models.When(due_date__lt=today, then=models.Value(-1)),
+                models.When(due_date=today, then=models.Value(0)),
+                models.When(due_date__lt=today + relativedelta(days=3), then=models.Value(1)),
+                models.When(due_date__isnull=False, then=models.Value(2)),
+                default=models.Value(3),
+                output_field=models.IntegerField(),
+            )
+        )
+
+    def rows(self) -> "TodoQuerySet":
+        """
+        Returns the todos as `TodoRow` objects, a slotted read model for the list views fetched with `.values()`, the
+        project and context names of every batch of rows are fetched with one query per collection type.
+        """
+        from .functions.rows import ROW_FIELDS, TodoRowIterable
+
+        todos = self if "due_date_code_value" in self.query.annotations else self.with_due_date_code()
+        todos = todos.values(*ROW_FIELDS)
+        todos._iterable_class = TodoRowIterable
+
+        return todos
+
+    def _due_date_counts(self) -> dict[str, models.Count]:
+        return {name: models.Count("id", filter=models.Q(due_date_code_value=code)) for name, code in DUE_DATE_FILTERS.items()}
+
+    def due_date_counts(self) -> dict[str, int]:
+        """Returns the number of todos per due date code in a single aggregate query, keyed by the dashboard filter names."""
+        return self.aggregate(**self._due_date_counts())
+
+    async def adue_date_counts(self) -> dict[str, int]:
+        return await self.aaggregate(**self._due_date_counts())
+
+
+# Columns of the annotation summary on Todo, see `functions.counters.update_annotation_summaries`
+SUMMARY_FIELDS = {"annotation_count", "last_annotated", "annotation_preview"}
 
 
 class Todo(models.Model):
@@ -65,6 +155,7 @@ class Todo(models.Model):
     due_date = models.DateField(blank=True, null=True)
     completion_date = models.DateField(blank=True, null=True)
     _completed = models.BooleanField("completed?", default=False)
+    advanced = models.BooleanField(default=False, editable=False, help_text="Set once the next iteration of a completed recurring todo has been created.")
 
     projects = models.ManyToManyField(Project, blank=True, related_name="todos")
     contexts = models.ManyToManyField(Context, blank=True, related_name="todos")
@@ -72,9 +163,38 @@ class Todo(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
 
+    # Summary of the annotations, kept up to date by `functions.counters` so lists do not need to load them
+    annotation_count = models.IntegerField(default=0, editable=False)
+    last_annotated = models.DateTimeField(blank=True, null=True, editable=False)
+    annotation_preview = models.CharField(max_length=100, blank=True, editable=False)
+
+    # Sort keys stored by the database, todos without a date are sorted last
+    due_date_value = models.GeneratedField(expression=Coalesce("due_date", models.Value("9999-12-31")), output_field=models.DateField(), db_persist=True)
+    start_date_value = models.GeneratedField(expression=Coalesce("start_date", models.Value("9999-12-31")), output_field=models.DateField(), db_persist=True)
+
+    objects = TodoQuerySet.as_manager()
+
     def __str__(self):
         return self.summary
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+
+        # Completion state as stored, used to move the project and context counters when it changes on save
+        if "completion_date" in field_names:
+            instance._loaded_completed = instance.completion_date is not None
+
+        return instance
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["due_date_value", "start_date_value", "priority"], condition=models.Q(completion_date__isnull=True), name="todo_open_sort_idx"),
+            models.Index(fields=["due_date_value", "start_date_value", "priority"], condition=models.Q(completion_date__isnull=False), name="todo_completed_sort_idx"),
+            models.Index(fields=["modified"], name="todo_modified_idx"),
+            models.Index(fields=["id"], condition=models.Q(completion_date__isnull=False, advanced=False) & ~models.Q(recurrence=""), name="todo_to_advance_idx"),
+        ]
+
     @property
     def summary(self) -> str:
         """Returns a summary of the description (truncated to max. 20 words)"""
@@ -145,7 +265,25 @@ class Todo(models.Model):
     def save(self, *args, **kwargs):
         self._completed = self.completion_date is not None
 
-        super(Todo, self).save(*args, **kwargs)
+        # The annotation summary is only written by `functions.counters`, never from a possibly stale instance
+        restricted = not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert")
+        if restricted:
+            excluded = self.get_deferred_fields() | SUMMARY_FIELDS
+            kwargs["update_fields"] = [field.name for field in self._meta.concrete_fields if not field.primary_key and not field.generated and field.attname not in excluded]
+
+        try:
+            super(Todo, self).save(*args, **kwargs)
+        except DatabaseError as error:
+            # Raised as is (not as a subclass) when no row was updated: the todo was deleted in the meantime. Nothing
+            # was written, so save it again in full, which inserts it as Django does for a save without update_fields.
+            if not restricted or type(error) is not DatabaseError:
+                raise
+
+            if transaction.get_connection(kwargs.get("using")).in_atomic_block:
+                transaction.set_rollback(False, using=kwargs.get("using"))
+
+            del kwargs["update_fields"]
+            super(Todo, self).save(*args, **kwargs)
 
     def mark_complete(self, completion_date: date = timezone.localdate()) -> None:
         """Marks a todo as completed, using the supplied completion_date (default: today)"""
@@ -157,13 +295,19 @@ class Todo(models.Model):
         self.completion_date = None
         self.save()
 
-    def postpone(self, pattern: str) -> None:
+    async def amark_not_complete(self) -> None:
+        self.completion_date = None
+        await self.asave()
+
+    def postpone(self, pattern: str, save: bool = True) -> None:
         """
         Postpones the todo based on the given pattern. Following rules are followed:
 
         * If due_date:
             new due_date = today + pattern if due_date is passed else due_date + pattern
         * New start_date = today + pattern if start_date is passed or None else start_date + pattern
+
+        By passing in `save=False` the todo is only changed but not saved to the database.
         """
 
         if self.due_date:
@@ -182,45 +326,25 @@ class Todo(models.Model):
             else:
                 self.start_date = to_date(pattern)
 
-        self.save()
+        if save:
+            self.save()
+
+    async def apostpone(self, pattern: str) -> None:
+        self.postpone(pattern, save=False)
+        await self.asave()
 
     def to_string(self) -> str:
         """Returns a todo.txt compliant string"""
-        task = Task(self.description)
-
-        task.priority = self.priority
-        task.is_completed = self.is_completed
-        task.creation_date = self.created.date()
-
-        if self.due_date is not None:
-            task.add_attribute("due", self.due_date.isoformat())
-
-        if self.start_date is not None:
-            task.add_attribute("t", self.start_date.isoformat())
-
-        if self.recurrence is not None and self.recurrence != "":
-            task.add_attribute("rec", self.recurrence)
-
-        for project in self.projects.all():
-            task.add_project(project.name.replace(" ", "-"))
-
-        for context in self.contexts.all():
-            task.add_context(context.name.replace(" ", "-"))
-
-        return str(task)
+        return todo_string(self, [project.name for project in self.projects.all()], [context.name for context in self.contexts.all()])
 
     to_string.short_description = "Todo.txt string"
 
-    def update_from_string(self, string: str) -> None:
-        """Updates the todo based on the information from the todo.txt string passed in."""
-        task = Task(string)
-
-        all_projects = {project.name: project for project in Project.objects.all()}
-        all_contexts = {context.name: context for context in Context.objects.all()}
-
+    def set_fields_from_task(self, task: Task) -> None:
+        """Copies the description, priority, dates and recurrence of a parsed todo.txt task onto this todo, without saving."""
         self.description = task.bare_description()
         self.priority = task.priority
         self.completion_date = task.completion_date
+        self._completed = self.completion_date is not None
 
         for attribute_key, attribute_values in task.attributes.items():
             match attribute_key:
@@ -236,28 +360,24 @@ class Todo(models.Model):
                 case _:
                     continue
 
-        self.save()
-
-        self.projects.clear()
-        self.contexts.clear()
-
-        for project in task.projects:
-            project = re.sub(r"-+", " ", project)
+    def update_from_string(self, string: str) -> None:
+        """Updates the todo based on the information from the todo.txt string passed in."""
+        from .functions.todotxt import resolve_names, task_names
 
-            if project in all_projects.keys():
-                self.projects.add(all_projects[project])
+        task = Task(string)
 
-            else:
-                self.projects.create(name=project)
+        self.set_fields_from_task(task)
+        self.save()
 
-        for context in task.contexts:
-            context = re.sub(r"-+", " ", context)
+        projects, contexts = task_names(task)
 
-            if context in all_contexts.keys():
-                self.contexts.add(all_contexts[context])
+        # Only the names in the string are resolved, through the name index, new ones are created
+        self.projects.set(resolve_names(Project, set(projects)).values())
+        self.contexts.set(resolve_names(Context, set(contexts)).values())
 
-            else:
-                self.contexts.create(name=context)
+    async def aupdate_from_string(self, string: str) -> None:
+        """Async version of `update_from_string`, which runs as a whole in a worker thread as it spans several queries."""
+        await sync_to_async(self.update_from_string)(string)
 
     @classmethod
     def from_string(cls, string: str) -> "Todo":
@@ -267,6 +387,10 @@ class Todo(models.Model):
 
         return todo
 
+    @classmethod
+    async def afrom_string(cls, string: str) -> "Todo":
+        return await sync_to_async(cls.from_string)(string)
+
 
 class Annotation(models.Model):
     """An annotation can be used to keep track of changes/statuses and notes for a given todo"""
@@ -283,3 +407,6 @@ class Annotation(models.Model):
     class Meta:
         get_latest_by = ["created"]
         ordering = ["-created"]
+        indexes = [
+            models.Index(fields=["modified"], name="annotation_modified_idx"),
+        ]
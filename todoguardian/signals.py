@@ -0,0 +1,132 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.db import connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from .functions.conditional import touch_todos
+from .functions.counters import add_counts, collection_model, recount, update_annotation_summaries, update_counts
+from .functions.fragments import invalidate_todo_fragments
+from .functions.search import SEARCH_TABLE, get_backend
+from .functions.sqlite import apply_pragmas
+from .functions.timing import install_query_recorder
+from .models import Annotation, Context, Project, Todo
+
+
+@receiver([post_save, post_delete], sender=Todo)
+def todo_changed(sender, instance: Todo, **kwargs) -> None:
+    invalidate_todo_fragments([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Annotation)
+def annotation_changed(sender, instance: Annotation, **kwargs) -> None:
+    invalidate_todo_fragments([instance.todo_id])
+
+
+@receiver([post_save, pre_delete], sender=Project)
+@receiver([post_save, pre_delete], sender=Context)
+def todo_collection_changed(sender, instance: Project | Context, **kwargs) -> None:
+    if kwargs.get("created"):
+        return
+
+    todo_ids = list(instance.todos.values_list("id", flat=True))
+    invalidate_todo_fragments(todo_ids)
+    touch_todos(todo_ids)
+
+
+@receiver(m2m_changed, sender=Todo.projects.through)
+@receiver(m2m_changed, sender=Todo.contexts.through)
+def todo_relations_changed(sender, instance: Todo | Project | Context, action: str, reverse: bool, pk_set: set[int] | None, **kwargs) -> None:
+    if action not in ["post_add", "post_remove", "pre_clear"]:
+        return
+
+    if not reverse:
+        invalidate_todo_fragments([instance.pk])
+        instance.modified = touch_todos([instance.pk])
+        return
+
+    todo_ids = list(pk_set) if pk_set is not None else list(instance.todos.values_list("id", flat=True))
+    invalidate_todo_fragments(todo_ids)
+    touch_todos(todo_ids)
+
+
+@receiver(post_migrate)
+def install_search(sender: AppConfig, using: str, **kwargs) -> None:
+    # Rebuilding a table in a migration (as SQLite does for most schema changes) drops its triggers, so restore them
+    if sender.name == "todoguardian" and SEARCH_TABLE in connections[using].introspection.table_names():
+        get_backend(connections[using]).install()
+
+
+@receiver(post_save, sender=Todo)
+def todo_saved_counts(sender, instance: Todo, created: bool, **kwargs) -> None:
+    # New todos have no projects or contexts yet, they are counted once linked
+    if not created:
+        before = getattr(instance, "_loaded_completed", None)
+
+        if before is None:
+            recount(Project, instance.projects.values_list("pk", flat=True))
+            recount(Context, instance.contexts.values_list("pk", flat=True))
+        else:
+            update_counts({instance.pk: (before, instance.is_completed)})
+
+    instance._loaded_completed = instance.is_completed
+
+
+@receiver(pre_delete, sender=Todo)
+def todo_deleted_counts(sender, instance: Todo, **kwargs) -> None:
+    update_counts({instance.pk: (instance.is_completed, None)})
+
+
+@receiver(m2m_changed, sender=Todo.projects.through)
+@receiver(m2m_changed, sender=Todo.contexts.through)
+def todo_relations_changed_counts(sender, instance: Todo | Project | Context, action: str, reverse: bool, model: type, pk_set: set[int] | None, **kwargs) -> None:
+    if action not in ["post_add", "pre_remove", "post_remove", "pre_clear"]:
+        return
+
+    sign = -1 if action != "post_add" else 1
+    collection = collection_model(sender)
+
+    # pk_set holds the ids asked to be removed, only those that were linked are counted after the removal
+    if action == "pre_remove":
+        column = collection._meta.model_name + "_id"
+        links = sender.objects.filter(todo_id__in=pk_set, **{column: instance.pk}) if reverse else sender.objects.filter(todo_id=instance.pk, **{column + "__in": pk_set})
+        instance._removed_links = set(links.values_list("todo_id" if reverse else column, flat=True))
+        return
+
+    if action == "post_remove":
+        pk_set = instance.__dict__.pop("_removed_links", pk_set)
+
+    if not reverse:
+        if action == "pre_clear":
+            pk_set = set(getattr(instance, "projects" if collection is Project else "contexts").values_list("pk", flat=True))
+
+        add_counts(collection, {pk: [0, sign] if instance.is_completed else [sign, 0] for pk in pk_set})
+
+    elif action == "pre_clear":
+        collection.objects.filter(pk=instance.pk).update(open_count=0, completed_count=0)
+
+    else:
+        completed = Todo.objects.filter(pk__in=pk_set, completion_date__isnull=False).count()
+        add_counts(collection, {instance.pk: [sign * (len(pk_set) - completed), sign * completed]})
+
+
+@receiver([post_save, post_delete], sender=Annotation)
+def annotation_changed_summary(sender, instance: Annotation, **kwargs) -> None:
+    update_annotation_summaries([instance.todo_id])
+
+    # Keep the todo this annotation was created through in line with the database
+    if Annotation.todo.is_cached(instance):
+        instance.todo.refresh_from_db(fields=["annotation_count", "last_annotated", "annotation_preview"])
+
+
+@receiver(connection_created)
+def record_queries(sender, connection: BaseDatabaseWrapper, **kwargs) -> None:
+    install_query_recorder(connection)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection: BaseDatabaseWrapper, **kwargs) -> None:
+    if connection.vendor == "sqlite" and settings.TODOGUARDIAN_SQLITE_PRAGMAS:
+        apply_pragmas(connection, settings.TODOGUARDIAN_SQLITE_PRAGMAS)
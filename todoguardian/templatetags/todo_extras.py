@@ -1,11 +1,19 @@
 from django import template
+from django.utils.safestring import SafeString
 
-from ..models import Todo
+from ..functions.fragments import render_todo_fragment
+from ..functions.rows import TodoRow
 
 register = template.Library()
 
 
-@register.inclusion_tag("templatetags/show_todo.html")
-def show_todo(todo: Todo):
-    """Renders a given todo."""
-    return {"todo": todo}
+@register.simple_tag(takes_context=True)
+def show_todo(context: template.Context, todo: TodoRow) -> SafeString:
+    """Renders a given todo as a table row."""
+    return render_todo_fragment("templatetags/show_todo.html", todo, context.get("csrf_token"))
+
+
+@register.simple_tag(takes_context=True)
+def show_todo_card(context: template.Context, todo: TodoRow) -> SafeString:
+    """Renders a given todo as a card (small screens)."""
+    return render_todo_fragment("templatetags/show_todo_card.html", todo, context.get("csrf_token"))
@@ -0,0 +1,8 @@
+from django.urls import include, path
+
+from ..urls import app_name, get_urlpatterns
+
+urlpatterns = [
+    path("", include((get_urlpatterns(asynchronous=True), app_name))),
+    path("initials-avatar/", include("django_initials_avatar.urls")),
+]
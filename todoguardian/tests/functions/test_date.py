@@ -1,4 +1,4 @@
-from datetime import date
+from datetime import date, timedelta
 
 from django.test import TestCase
 from freezegun import freeze_time
@@ -97,3 +97,25 @@ class ToDateTestCase(TestCase):
     def testNegativePattern(self):
         self.assertEqual(to_date("-1d"), self.yesterday)
         self.assertEqual(to_date("-0d"), self.today)
+
+    def testBusinessDaysMatchDayByDay(self):
+        for offset in [date(2024, 6, 3) + timedelta(days=i) for i in range(7)]:
+            for length in range(-15, 16):
+                expected = offset
+                days = length
+                while days != 0:
+                    expected = expected + timedelta(days=1 if length > 0 else -1)
+                    if expected.weekday() < 5:
+                        days = days - (1 if length > 0 else -1)
+
+                self.assertEqual(to_date("{length}b".format(length=length), offset), expected, (offset, length))
+
+    def testIsoFastPath(self):
+        self.assertEqual(to_date("2024-02-29"), date(2024, 2, 29))
+        self.assertIsNone(to_date("2024-02-30"))
+
+    def testMemoizedPerDay(self):
+        self.assertEqual(to_date("tomorrow"), self.tomorrow)
+
+        with freeze_time("2024-06-08"):
+            self.assertEqual(to_date("tomorrow"), date(2024, 6, 9))
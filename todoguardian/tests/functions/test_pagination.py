@@ -0,0 +1,56 @@
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from ...functions.pagination import InvalidCursorException, _after, decode_cursor, encode_cursor, paginate
+from ...models import Todo
+
+
+class PaginateTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        today = timezone.localdate()
+        for i in range(23):
+            Todo.objects.create(description="Todo {i}".format(i=i), priority=[None, "A", "B"][i % 3], due_date=today if i % 2 else None, start_date=today)
+
+        self.todos = Todo.objects.filter(completion_date=None)
+        self.ordered = list(self.todos.order_by("due_date_value", "start_date_value", "priority", "id"))
+
+    def testFirstPage(self):
+        page = paginate(self.todos, page_size=10)
+
+        self.assertEqual(page.todos, self.ordered[:10])
+        self.assertIsNone(page.previous_cursor)
+        self.assertIsNotNone(page.next_cursor)
+
+    def testWalkForwardAndBack(self):
+        pages = [paginate(self.todos, page_size=10)]
+        while pages[-1].next_cursor is not None:
+            pages.append(paginate(self.todos, after=pages[-1].next_cursor, page_size=10))
+
+        self.assertEqual([todo for page in pages for todo in page.todos], self.ordered)
+        self.assertEqual([len(page.todos) for page in pages], [10, 10, 3])
+
+        previous = paginate(self.todos, before=pages[-1].previous_cursor, page_size=10)
+        self.assertEqual(previous.todos, pages[1].todos)
+        self.assertEqual(previous.next_cursor, pages[1].next_cursor)
+
+        first = paginate(self.todos, before=previous.previous_cursor, page_size=10)
+        self.assertEqual(first.todos, pages[0].todos)
+        self.assertIsNone(first.previous_cursor)
+
+    def testCursor(self):
+        todo = self.ordered[0]
+
+        self.assertEqual(decode_cursor(encode_cursor(todo)), (todo.due_date_value, todo.start_date_value, todo.priority, todo.id))
+        self.assertRaises(InvalidCursorException, decode_cursor, "garbage")
+
+    def testDeepPageUsesIndex(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Query plans are SQLite specific")
+
+        cursor = encode_cursor(self.ordered[15])
+        plan = self.todos.filter(_after(*decode_cursor(cursor))).order_by("due_date_value", "start_date_value", "priority", "id").explain()
+
+        self.assertIn("SEARCH todoguardian_todo USING INDEX todo_open_sort_idx", plan)
@@ -1,8 +1,18 @@
+import fcntl
+from datetime import date
+from io import StringIO
+
 from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
 from django.utils import timezone
+from freezegun import freeze_time
 
-from ...functions.recurrence import NoRecurrenceException, advance_todo
+from ...functions.date import to_date
+from ...functions.recurrence import NoRecurrenceException, advance_todo, complete_todos, forecast, materialize_recurrences
+from ...functions.todotxt import import_todos
 from ...models import Todo
 
 
@@ -101,3 +111,130 @@ class TodoTestCase(TestCase):
     def testInvalidRecurrence(self):
         todo = Todo.objects.create(description="Test description", recurrence="1f")
         self.assertRaises(NoRecurrenceException, advance_todo, todo)
+
+
+class ForecastTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.today = date(2024, 6, 7)
+        self.until = date(2025, 6, 7)
+
+        for recurrence in ["1d", "3d", "+1w", "2w", "1b", "+5b", "1m", "+1m", "3m", "1y", "0d", "1f", ""]:
+            for due_date in [None, date(2024, 1, 31), date(2024, 2, 29), date(2024, 6, 8), date(2024, 6, 9), date(2024, 8, 31)]:
+                start_date = due_date - relativedelta(days=2) if due_date is not None else self.today
+                Todo.objects.create(description="Recurring todo", recurrence=recurrence, due_date=due_date, start_date=start_date)
+
+        Todo.objects.create(description="Completed todo", recurrence="1d", due_date=self.today, completion_date=self.today)
+
+    def expected(self):
+        """Walks every recurrence chain one step at a time using to_date."""
+        occurrences = []
+
+        for todo in Todo.objects.filter(completion_date=None).exclude(recurrence=""):
+            pattern = todo.recurrence.removeprefix("+")
+            due_date = todo.due_date or self.today
+
+            if to_date(pattern, due_date) is None or to_date(pattern, due_date) <= due_date:
+                continue
+
+            while (due_date := to_date(pattern, due_date)) <= self.until:
+                if due_date >= self.today:
+                    occurrences.append((todo.id, due_date, due_date - relativedelta(days=todo.length)))
+
+        return sorted(occurrences)
+
+    def testForecastMatchesStepByStep(self):
+        with freeze_time(self.today):
+            expected = self.expected()
+
+            with self.assertNumQueries(1):
+                result = forecast(Todo.objects.all(), self.until)
+
+        self.assertEqual(sorted(result), expected)
+        self.assertEqual([occurrence.due_date for occurrence in result], sorted(occurrence[1] for occurrence in expected))
+
+    def testEmpty(self):
+        self.assertEqual(len(forecast(Todo.objects.none(), self.until)), 0)
+
+
+class CompleteTodosTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.recurring_todo = Todo.from_string("Recurring todo due:today t:yesterday rec:1w +projecta @contexta @contextb")
+        self.strict_recurring_todo = Todo.from_string("Strict recurring todo due:yesterday rec:+1d +projectb")
+        self.yearly_todo = Todo.from_string("Yearly todo due:today rec:1y")
+        self.bare_todo = Todo.from_string("Bare todo +projecta")
+        self.completed_todo = Todo.from_string("x 2024-06-01 Completed todo rec:1d")
+        Todo.objects.filter(pk=self.completed_todo.pk).update(advanced=True)
+
+    def testComplete(self):
+        # 8 queries to complete the todos, 11 to create the next iterations
+        with self.assertNumQueries(19):
+            completed = complete_todos(Todo.objects.all())
+
+        self.assertEqual(completed, 4)
+        self.assertEqual(Todo.objects.count(), 8)
+        self.assertEqual(Todo.objects.filter(completion_date=timezone.localdate()).count(), 4)
+        self.assertEqual(set(Todo.objects.filter(completion_date=None).values_list("description", flat=True)), {"Recurring todo", "Strict recurring todo", "Yearly todo"})
+        self.assertEqual(Todo.objects.get(pk=self.completed_todo.pk).completion_date, date(2024, 6, 1))
+
+    def testMaterialize(self):
+        # Completed without `complete_todos`, so left to the materializer
+        for todo in [self.recurring_todo, self.strict_recurring_todo, self.yearly_todo, self.bare_todo]:
+            todo.mark_complete(timezone.localdate())
+
+        created = materialize_recurrences()
+
+        new_recurring_todo, new_strict_recurring_todo, new_yearly_todo = sorted(created, key=lambda todo: todo.description)
+        self.assertEqual(new_recurring_todo.due_date, timezone.localdate() + relativedelta(days=7))
+        self.assertEqual(new_recurring_todo.start_date, timezone.localdate() + relativedelta(days=6))
+        self.assertEqual(set(new_recurring_todo.projects.values_list("name", flat=True)), {"projecta"})
+        self.assertEqual(set(new_recurring_todo.contexts.values_list("name", flat=True)), {"contexta", "contextb"})
+        self.assertEqual(new_strict_recurring_todo.due_date, timezone.localdate())
+        self.assertEqual(set(new_strict_recurring_todo.projects.values_list("name", flat=True)), {"projectb"})
+
+        self.assertEqual(new_yearly_todo.due_date, timezone.localdate() + relativedelta(years=1))
+
+        # Idempotent
+        self.assertEqual(materialize_recurrences(), [])
+
+    def testLongRecurrencesHaveOpenSuccessor(self):
+        for line in ["Yearly review due:today rec:1y", "Quarterly report due:today rec:3m"]:
+            with self.subTest(line):
+                todo = Todo.from_string(line)
+                todo.mark_complete(timezone.localdate())
+                materialize_recurrences()
+
+                self.assertTrue(Todo.objects.filter(description=todo.description, completion_date=None, due_date__gt=timezone.localdate()).exists())
+
+    def testQueryCountIndependentOfTodoCount(self):
+        for i in range(20):
+            Todo.from_string("Recurring todo {i} due:today rec:1d +projecta @contexta".format(i=i))
+
+        Todo.objects.filter(completion_date=None).update(completion_date=timezone.localdate(), _completed=True)
+
+        # Per batch: select, savepoint, todo insert, two through selects and inserts, two link reads and counter
+        # updates, the advanced update and the release, plus the final select finding no more todos
+        with self.assertNumQueries(14):
+            created = materialize_recurrences(batch_size=100)
+
+        self.assertEqual(len(created), 23)
+
+    def testImportedCompletedTodosAreNotMaterialized(self):
+        list(import_todos(["x 2024-06-01 Imported todo rec:1d"]))
+
+        self.assertEqual([todo.description for todo in materialize_recurrences()], [])
+
+    def testCommandLock(self):
+        with open(settings.TODOGUARDIAN_RECURRENCE_LOCK_FILE, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+            with self.assertRaises(CommandError):
+                call_command("materialize_recurrences", stdout=StringIO())
+
+        self.recurring_todo.mark_complete(timezone.localdate())
+        call_command("materialize_recurrences", stdout=StringIO())
+
+        self.assertEqual(Todo.objects.filter(description="Recurring todo").count(), 2)
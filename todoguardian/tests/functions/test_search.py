@@ -0,0 +1,89 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from ...functions.search import SEARCH_TABLE, DatabaseSearchBackend, SQLiteSearchBackend, search
+from ...functions.todotxt import import_todos
+from ...models import Todo
+
+
+class SearchTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.groceries = Todo.objects.create(description="Buy groceries for the weekend")
+        self.report = Todo.objects.create(description="Write quarterly report")
+        self.report.annotations.create(text="Ask finance for the grocery budget")
+
+    def testDescription(self):
+        self.assertEqual([result.todo for result in search("weekend")], [self.groceries])
+
+    def testAnnotations(self):
+        results = search("budget")
+
+        self.assertEqual([result.todo for result in results], [self.report])
+        self.assertIn("<mark>budget</mark>", results[0].snippet)
+
+    def testRankingPrefersDescription(self):
+        self.assertEqual([result.todo for result in search("grocer")], [self.groceries, self.report])
+
+    def testHighlightIsEscaped(self):
+        Todo.objects.create(description="Fix <b>bold</b> rendering")
+
+        self.assertEqual(search("bold")[0].highlight, "Fix &lt;b&gt;<mark>bold</mark>&lt;/b&gt; rendering")
+
+    def testQuerySyntaxIsIgnored(self):
+        self.assertEqual(search('"weekend AND NOT ('), [])
+        self.assertEqual(search("   "), [])
+
+    def testIndexFollowsChanges(self):
+        self.groceries.description = "Buy flowers"
+        self.groceries.save()
+        self.assertEqual(search("weekend"), [])
+        self.assertEqual([result.todo for result in search("flowers")], [self.groceries])
+
+        self.report.annotations.all().delete()
+        self.assertEqual(search("budget"), [])
+
+        self.groceries.delete()
+        self.assertEqual(search("flowers"), [])
+
+    def testBulkImportIsIndexed(self):
+        list(import_todos(["Imported todo number {i}".format(i=i) for i in range(10)]))
+
+        self.assertEqual(len(search("imported")), 10)
+
+    def testRebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM {table}".format(table=SEARCH_TABLE))
+
+        self.assertEqual(search("weekend"), [])
+
+        call_command("rebuild_search_index", stdout=StringIO())
+
+        self.assertEqual([result.todo for result in search("budget")], [self.report])
+
+    def testFallbackBackend(self):
+        results = DatabaseSearchBackend().search("GROCER")
+
+        self.assertEqual({result.todo for result in results}, {self.groceries, self.report})
+        self.assertEqual(DatabaseSearchBackend().search_ids("budget"), [self.report.id])
+        self.assertEqual(SQLiteSearchBackend().search_ids("budget"), [self.report.id])
+
+    def testFilterTodos(self):
+        sum(import_todos(["Budget item {i}".format(i=i) for i in range(1100)]))
+
+        for backend in [DatabaseSearchBackend(), SQLiteSearchBackend()]:
+            with self.subTest(backend=type(backend).__name__):
+                self.assertEqual(backend.filter_todos(Todo.objects.all(), "budget").count(), 1101)
+                self.assertEqual(list(backend.filter_todos(Todo.objects.exclude(description__startswith="Budget"), "budget")), [self.report])
+                self.assertEqual(backend.filter_todos(Todo.objects.all(), " ").count(), 0)
+
+    def testView(self):
+        response = self.client.get(reverse("todoguardian:search"), {"q": "weekend"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "<mark>weekend</mark>")
@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+import tempfile
+
+from django.db import connection, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from ...functions.sqlite import get_pragmas
+from ...models import Todo
+
+PRAGMAS = {"journal_mode": "WAL", "synchronous": "NORMAL", "busy_timeout": 5000, "mmap_size": 1024 * 1024, "cache_size": -2048, "temp_store": "MEMORY"}
+
+WORKERS = 4
+WRITES = 50
+
+
+def _connect(path: str) -> DatabaseWrapper:
+    """Registers a connection to the given database file as `hammer`, configured like the production profile."""
+    connections["hammer"] = DatabaseWrapper(dict(connection.settings_dict, NAME=path, OPTIONS={"transaction_mode": "IMMEDIATE"}, CONN_MAX_AGE=600), alias="hammer")
+
+    return connections["hammer"]
+
+
+def _hammer(path: str, worker: int) -> None:
+    """Runs `WRITES` read-then-write transactions, like completing a todo does."""
+    _connect(path)
+    todos = Todo.objects.using("hammer")
+
+    for i in range(WRITES):
+        with transaction.atomic(using="hammer"):
+            todos.filter(completion_date=None).count()
+            todos.bulk_create([Todo(description="Worker {worker} todo {i}".format(worker=worker, i=i))])
+            todos.filter(description="Worker {worker} todo {i}".format(worker=worker, i=i)).update(completion_date=timezone.localdate())
+
+    connections["hammer"].close()
+
+
+@override_settings(TODOGUARDIAN_SQLITE_PRAGMAS=PRAGMAS)
+class SQLiteProfileTestCase(SimpleTestCase):
+    # Runs on a database file of its own, the default database is only declared so connections are allowed
+    databases = {"default"}
+
+    def setUp(self):
+        super().setUp()
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "db.sqlite3")
+
+        self.connection = _connect(self.path)
+        self.addCleanup(connections.__delitem__, "hammer")
+        self.addCleanup(self.connection.close)
+
+        with self.connection.schema_editor() as editor:
+            editor.create_model(Todo)
+
+    def testPragmas(self):
+        self.assertEqual(get_pragmas(self.connection, ["journal_mode", "synchronous", "busy_timeout", "temp_store"]), {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000, "temp_store": 2})
+
+    def testConcurrentWrites(self):
+        processes = [multiprocessing.get_context("fork").Process(target=_hammer, args=(self.path, worker)) for worker in range(WORKERS)]
+
+        for process in processes:
+            process.start()
+
+        for process in processes:
+            process.join(timeout=60)
+
+        self.assertEqual([process.exitcode for process in processes], [0] * WORKERS)
+
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM todoguardian_todo WHERE completion_date IS NOT NULL")
+            self.assertEqual(cursor.fetchone()[0], WORKERS * WRITES)
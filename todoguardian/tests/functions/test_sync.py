@@ -0,0 +1,156 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ...functions.sync import FileChangedException, MassDeletionException, MissingFileException, SyncResult, SyncState, line_id, needs_sync, state_path, sync_file
+from ...models import Todo
+
+
+class SyncTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.path = Path(directory.name) / "todo.txt"
+        self.state = SyncState()
+
+    def sync(self, lines=None):
+        if lines is not None:
+            self.path.write_text("".join(line + "\n" for line in lines))
+
+        return sync_file(self.path, self.state)
+
+    def lines(self):
+        return self.path.read_text().splitlines()
+
+    def line(self, todo):
+        return next(line for line in self.lines() if line_id(line) == todo.id)
+
+    def testFirstSyncMerges(self):
+        todo = Todo.from_string("Existing todo +projecta")
+
+        result = self.sync(["(A) New todo @home due:2024-06-07"])
+
+        self.assertEqual((result.created, result.written), (1, 1))
+        new = Todo.objects.get(description="New todo")
+        self.assertEqual(new.priority, "A")
+        self.assertEqual(self.lines(), [new.to_string() + " id:{id}".format(id=new.id), todo.to_string() + " id:{id}".format(id=todo.id)])
+        self.assertEqual(set(self.state.hashes), {todo.id, new.id})
+
+        # Todos written by the sync are checked once more, after that nothing changed on either side
+        self.assertEqual(self.sync(), SyncResult())
+        self.assertFalse(needs_sync(self.path, self.state))
+
+    def testOneLineEditIsOneUpdate(self):
+        todos = [Todo.from_string("Todo {i} +projecta".format(i=i)) for i in range(50)]
+        self.sync()
+
+        lines = self.lines()
+        lines[10] = lines[10].replace("Todo 10", "Changed todo") + " due:2024-06-07"
+
+        with mock.patch.object(Todo, "update_from_string", autospec=True, side_effect=Todo.update_from_string) as update_from_string:
+            result = self.sync(lines)
+
+        update_from_string.assert_called_once()
+        self.assertEqual((result.created, result.updated, result.deleted), (0, 1, 0))
+
+        todos[10].refresh_from_db()
+        self.assertEqual(todos[10].description, "Changed todo")
+        self.assertEqual(self.lines()[10], todos[10].to_string() + " id:{id}".format(id=todos[10].id))
+        self.assertEqual(self.lines()[:10], lines[:10])
+
+    def testDatabaseChangesAreWrittenBack(self):
+        todo = Todo.from_string("Some todo due:2024-06-07")
+        other = Todo.from_string("Other todo")
+        self.sync()
+
+        todo.postpone("2024-06-10")
+        Todo.from_string("Added todo")
+        result = self.sync()
+
+        self.assertEqual((result.created, result.updated, result.written), (0, 0, 2))
+        self.assertIn("due:2024-06-10", self.line(todo))
+        self.assertEqual(len(self.lines()), 3)
+
+        other.delete()
+        result = self.sync()
+
+        self.assertEqual(result.removed, 1)
+        self.assertEqual(len(self.lines()), 2)
+
+    def testRemovedLinesAreDeleted(self):
+        todo = Todo.from_string("Some todo")
+        Todo.from_string("Other todo")
+        self.sync()
+
+        result = self.sync([line for line in self.lines() if line_id(line) != todo.id])
+
+        self.assertEqual(result.deleted, 1)
+        self.assertFalse(Todo.objects.filter(pk=todo.pk).exists())
+
+    def testMissingFileIsRefused(self):
+        Todo.from_string("Some todo")
+        Todo.from_string("Other todo")
+        self.sync()
+
+        self.path.unlink()
+
+        with self.assertRaises(MissingFileException):
+            self.sync()
+
+        self.assertEqual(Todo.objects.count(), 2)
+        self.assertEqual(sync_file(self.path, self.state, force=True).deleted, 2)
+
+    def testMassDeletionIsRefused(self):
+        todos = [Todo.from_string("Todo {i}".format(i=i)) for i in range(4)]
+        self.sync()
+
+        with self.assertRaises(MassDeletionException):
+            self.sync([self.line(todos[0]), "New todo"])
+
+        self.assertEqual(Todo.objects.count(), 4)
+
+        result = sync_file(self.path, self.state, force=True)
+        self.assertEqual((result.created, result.deleted), (1, 3))
+
+    def testConflictKeepsFile(self):
+        todo = Todo.from_string("Some todo")
+        self.sync()
+
+        todo.postpone("2024-06-10")
+        result = self.sync([self.line(todo).replace("Some todo", "Changed todo")])
+
+        self.assertEqual(result.updated, 1)
+        todo.refresh_from_db()
+        self.assertEqual(todo.description, "Changed todo")
+
+    def testCommand(self):
+        Todo.from_string("Some todo")
+
+        call_command("sync_todotxt", str(self.path), stdout=StringIO())
+
+        self.assertEqual(len(self.lines()), 1)
+        self.assertEqual(set(SyncState.load(state_path(self.path)).hashes), {Todo.objects.get().id})
+
+    def testCommandGivesUpWhileFileKeepsChanging(self):
+        with mock.patch("todoguardian.management.commands.sync_todotxt.sync_file", side_effect=FileChangedException("changed")) as sync, mock.patch("time.sleep") as sleep:
+            with self.assertRaisesMessage(CommandError, "giving up after 3 attempts"):
+                call_command("sync_todotxt", str(self.path), "--retries", "3", "--interval", "5", stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(sync.call_count, 3)
+        self.assertEqual([call.args for call in sleep.call_args_list], [(5,), (5,)])
+
+    def testCommandRefusesMissingFile(self):
+        Todo.from_string("Some todo")
+        call_command("sync_todotxt", str(self.path), stdout=StringIO())
+
+        self.path.unlink()
+
+        with self.assertRaisesMessage(CommandError, "--force"):
+            call_command("sync_todotxt", str(self.path), stdout=StringIO())
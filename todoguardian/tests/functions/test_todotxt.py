@@ -0,0 +1,130 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from freezegun import freeze_time
+
+from ...functions.todotxt import export_queryset, export_todos, import_todos, resolve_names
+from ...models import Context, Project, Todo
+
+
+@freeze_time("2024-06-07")
+class ImportTodosTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.project_a = Project.objects.create(name="project a")
+
+    def testImport(self):
+        lines = [
+            "(A) First todo due:today +project-a +project-b @home t:tomorrow rec:+1w\n",
+            "\n",
+            "x 2024-06-01 Done todo +project-b\n",
+            "Bare todo",
+        ]
+        self.assertEqual(sum(import_todos(lines)), 3)
+
+        first = Todo.objects.get(description="First todo")
+        self.assertEqual(first.priority, "A")
+        self.assertEqual(first.due_date, date(2024, 6, 7))
+        self.assertEqual(first.start_date, date(2024, 6, 8))
+        self.assertEqual(first.recurrence, "+1w")
+        self.assertEqual(set(first.projects.values_list("name", flat=True)), {"project a", "project b"})
+        self.assertEqual(set(first.contexts.values_list("name", flat=True)), {"home"})
+
+        done = Todo.objects.get(description="Done todo")
+        self.assertEqual(done.completion_date, date(2024, 6, 1))
+        self.assertTrue(done._completed)
+
+        self.assertEqual(Project.objects.count(), 2)
+        self.assertEqual(Context.objects.count(), 1)
+
+    def testBatches(self):
+        lines = ["Todo {i} +shared @shared".format(i=i) for i in range(25)]
+
+        self.assertEqual(list(import_todos(lines, batch_size=10)), [10, 10, 5])
+        self.assertEqual(Todo.objects.count(), 25)
+        self.assertEqual(Project.objects.filter(name="shared").count(), 1)
+        self.assertEqual(Project.objects.get(name="shared").todos.count(), 25)
+
+    def testQueryCountIndependentOfBatchSize(self):
+        lines = ["Todo {i} +project-{i} @context-{i}".format(i=i) for i in range(100)]
+
+        # 2 name lookups, 2 name inserts, 2 todo inserts (split by the SQLite parameter limit), 2 through inserts,
+        # 2 counter updates, plus savepoint handling
+        with self.assertNumQueries(12):
+            list(import_todos(lines, batch_size=100))
+
+
+class ResolveNamesTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.project_a = Project.objects.create(name="Project A")
+
+    def testIgnoresCase(self):
+        todo = Todo.from_string("Some todo +project-a +Project-B +project-b")
+
+        self.assertEqual(set(todo.projects.all()), {self.project_a, Project.objects.get(name__iexact="project b")})
+        self.assertEqual(Project.objects.count(), 2)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Project.objects.create(name="PROJECT A")
+
+    def testCachedNamesAreChecked(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(resolve_names(Project, {"project a", "project c"}), {"project a": self.project_a.id, "project c": Project.objects.get(name="project c").id})
+
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_names(Project, {"PROJECT A"}), {"PROJECT A": self.project_a.id})
+
+        # Renamed and deleted without signals, as other processes keep their own cache
+        Project.objects.filter(pk=self.project_a.id).update(name="Renamed")
+        Project.objects.filter(name="project c")._raw_delete(using="default")
+
+        name_map = resolve_names(Project, {"project a", "project c"})
+
+        self.assertEqual(Project.objects.get(pk=name_map["project a"]).name, "project a")
+        self.assertEqual(Project.objects.get(pk=name_map["project c"]).name, "project c")
+        self.assertNotEqual(name_map["project a"], self.project_a.id)
+
+    def testUpdateQueriesIndependentOfNames(self):
+        todo = Todo.from_string("Some todo +project-a @home")
+
+        with self.assertNumQueries(11):
+            todo.update_from_string("Some todo +project-a +project-b @home")
+
+        Project.objects.bulk_create([Project(name="project {i}".format(i=i)) for i in range(100)])
+        Context.objects.bulk_create([Context(name="context {i}".format(i=i)) for i in range(100)])
+
+        with self.assertNumQueries(11):
+            todo.update_from_string("Some todo +project-a +project-b +project-c @home")
+
+
+@freeze_time("2024-06-07")
+class ExportTodosTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        lines = ["(A) Open todo {i} due:2024-06-10 +project-a @home".format(i=i) for i in range(10)]
+        lines.append("x 2024-06-01 Done todo +project-b")
+        list(import_todos(lines))
+
+    def testStatus(self):
+        self.assertEqual(len(list(export_todos(export_queryset("open")))), 10)
+        self.assertEqual(len(list(export_todos(export_queryset("completed")))), 1)
+        self.assertEqual(len(list(export_todos(export_queryset("all")))), 11)
+
+    def testLine(self):
+        line = next(export_todos(export_queryset("completed")))
+
+        self.assertEqual(line, "x 2024-06-01 2024-06-07 Done todo t:2024-06-07 +project-b\n")
+
+    def testQueryCountDependsOnChunks(self):
+        # One query for the todos, plus one for projects and one for contexts per chunk of 5
+        with self.assertNumQueries(7):
+            list(export_todos(export_queryset("all"), chunk_size=5))
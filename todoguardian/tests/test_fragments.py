@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from freezegun import freeze_time
+
+from ..functions.fragments import CSRF_PLACEHOLDER, DUE_DAY_PLACEHOLDER, fragment_key, render_todo_fragment
+from ..models import Annotation, Project, Todo
+
+TEMPLATE = "templatetags/show_todo.html"
+CARD_TEMPLATE = "templatetags/show_todo_card.html"
+
+
+class FragmentCacheTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+        self.todo = Todo.from_string("Cached todo +projecta @contexta")
+        self.todo = Todo.objects.rows().get(pk=self.todo.id)
+
+    def testCached(self):
+        html = render_todo_fragment(TEMPLATE, self.todo, "token")
+
+        self.assertIn("Cached todo", html)
+        self.assertIn("token", html)
+        self.assertNotIn(CSRF_PLACEHOLDER, html)
+        self.assertIn(CSRF_PLACEHOLDER, cache.get(fragment_key(TEMPLATE, self.todo.id))[1])
+
+        with self.assertTemplateNotUsed(TEMPLATE):
+            self.assertEqual(render_todo_fragment(TEMPLATE, self.todo, "token"), html)
+
+    def testFingerprintChange(self):
+        render_todo_fragment(TEMPLATE, self.todo, "token")
+        Project.objects.filter(pk=self.todo.projects[0].id).update(name="renamed")
+
+        todo = Todo.objects.rows().get(pk=self.todo.id)
+        self.assertIn("renamed", render_todo_fragment(TEMPLATE, todo, "token"))
+
+    def testRelativeTimeIsNotCached(self):
+        Annotation.objects.create(todo_id=self.todo.id, text="New annotation")
+        todo = Todo.objects.rows().get(pk=self.todo.id)
+
+        with freeze_time(todo.last_annotated):
+            self.assertIn("(now)", render_todo_fragment(CARD_TEMPLATE, todo, "token"))
+
+        with freeze_time(todo.last_annotated + timedelta(minutes=5)), self.assertTemplateNotUsed(CARD_TEMPLATE):
+            self.assertIn("(5\xa0minutes ago)", render_todo_fragment(CARD_TEMPLATE, todo, "token"))
+
+    def testSignalsInvalidate(self):
+        render_todo_fragment(TEMPLATE, self.todo, "token")
+
+        Annotation.objects.create(todo_id=self.todo.id, text="New annotation")
+        self.assertIsNone(cache.get(fragment_key(TEMPLATE, self.todo.id)))
+
+        render_todo_fragment(TEMPLATE, self.todo, "token")
+        Todo.objects.get(pk=self.todo.id).projects.clear()
+        self.assertIsNone(cache.get(fragment_key(TEMPLATE, self.todo.id)))
+
+        render_todo_fragment(TEMPLATE, self.todo, "token")
+        project = Project.objects.create(name="projectb")
+        project.todos.add(self.todo.id)
+        self.assertIsNone(cache.get(fragment_key(TEMPLATE, self.todo.id)))
+
+        render_todo_fragment(TEMPLATE, self.todo, "token")
+        project.delete()
+        self.assertIsNone(cache.get(fragment_key(TEMPLATE, self.todo.id)))
+
+    def testDashboardUsesFreshCsrfToken(self):
+        self.client.get(reverse("todoguardian:dashboard"))
+
+        response = self.client.get(reverse("todoguardian:dashboard"))
+        self.assertNotContains(response, CSRF_PLACEHOLDER)
+        self.assertContains(response, 'name="csrfmiddlewaretoken" value="{token}"'.format(token=response.context["csrf_token"]), count=5)
+
+        self.client.get(reverse("todoguardian:todo_modals", args=[self.todo.id]))
+
+        response = self.client.get(reverse("todoguardian:todo_modals", args=[self.todo.id]))
+        self.assertNotContains(response, CSRF_PLACEHOLDER)
+        self.assertContains(response, 'name="csrfmiddlewaretoken" value="', count=3)
+
+    def testDateIsNotCached(self):
+        Todo.objects.filter(pk=self.todo.id).update(due_date="2024-06-01")
+
+        with freeze_time("2024-06-01 20:00"):
+            todo = Todo.objects.rows().get(pk=self.todo.id)
+            html = render_todo_fragment(CARD_TEMPLATE, todo, "token")
+
+            self.assertIn("Today", html)
+            self.assertIn("fa-triangle-exclamation", html)
+            self.assertIn(DUE_DAY_PLACEHOLDER, cache.get(fragment_key(CARD_TEMPLATE, self.todo.id))[1])
+
+        with freeze_time("2024-06-02 00:00"), self.assertTemplateNotUsed(CARD_TEMPLATE):
+            todo = Todo.objects.rows().get(pk=self.todo.id)
+            html = render_todo_fragment(CARD_TEMPLATE, todo, "token")
+
+            self.assertIn("Yesterday", html)
+            self.assertIn("fa-circle-exclamation", html)
+            self.assertNotIn("fa-triangle-exclamation", html)
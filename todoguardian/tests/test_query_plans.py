@@ -0,0 +1,38 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Todo
+
+
+@skipUnless(connection.vendor == "sqlite", "Query plans are SQLite specific")
+class QueryPlanTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        Todo.objects.create(description="Open todo")
+        Todo.objects.create(description="Completed todo", completion_date=timezone.localdate())
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+
+        self.assertIn("USING INDEX {index}".format(index=index), plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def testDashboardUsesOpenIndex(self):
+        todos = Todo.objects.filter(completion_date=None).exclude(start_date__gt=timezone.localdate()).order_by("due_date_value", "start_date_value", "priority")
+
+        self.assertUsesIndex(todos, "todo_open_sort_idx")
+
+    def testArchiveUsesCompletedIndex(self):
+        todos = Todo.objects.filter(completion_date__isnull=False).order_by("due_date_value", "start_date_value", "priority")
+
+        self.assertUsesIndex(todos, "todo_completed_sort_idx")
+
+    def testSortKeys(self):
+        todo = Todo.objects.get(description="Open todo")
+
+        self.assertEqual(todo.due_date_value.isoformat(), "9999-12-31")
+        self.assertEqual(todo.start_date_value, todo.start_date)
@@ -0,0 +1,101 @@
+import re
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import URLResolver, get_resolver, reverse
+
+from .. import views
+from ..functions.todotxt import import_todos
+from ..models import Annotation, Todo
+
+
+def budgeted_views(urlconf: str) -> list[tuple[str, object]]:
+    """Returns the URL names and views with a query budget in the given URLconf."""
+    found = []
+
+    def walk(patterns, namespace=""):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns, namespace + pattern.namespace + ":" if pattern.namespace else namespace)
+            elif hasattr(pattern.callback, "query_budget"):
+                found.append((namespace + pattern.name, pattern))
+
+    walk(get_resolver(urlconf).url_patterns)
+
+    return found
+
+
+class ServerTimingTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.todo = Todo.from_string("Some todo +projecta @contexta due:today")
+
+    def testHeaderAndLogLine(self):
+        with self.assertLogs("todoguardian.middleware", "INFO") as logs:
+            response = self.client.get(reverse("todoguardian:dashboard"))
+
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="5 queries", tpl;dur=[\d.]+, view;dur=[\d.]+$')
+        self.assertIn("view=todoguardian:dashboard status=200 queries=5 budget=8", logs.output[0])
+
+    def testOverBudget(self):
+        with mock.patch.object(views.annotations, "query_budget", 0), self.assertLogs("todoguardian.middleware", "WARNING") as logs:
+            self.client.get(reverse("todoguardian:todo_annotations", args=[self.todo.id]))
+
+        self.assertIn("Query budget exceeded", logs.output[0])
+
+
+class QueryBudgetTestCase(TestCase):
+    def populate(self, number):
+        lines = ["Todo {i} +project{project} +projecta @context{context} due:{due}d rec:1w".format(i=i, project=i % 7, context=i % 3, due=i % 10) for i in range(number)]
+        lines += ["x 2024-06-01 Done {i} +projecta @contexta".format(i=i) for i in range(number)]
+        sum(import_todos(lines))
+
+        Annotation.objects.bulk_create([Annotation(todo_id=id, text="Annotation") for id in Todo.objects.values_list("id", flat=True)])
+
+    def queries(self, name, pattern):
+        args = [Todo.objects.earliest("id").id] if pattern.pattern.converters else []
+        response = self.client.get(reverse(name, args=args), {"q": "todo"})
+
+        self.assertEqual(response.status_code, 200, name)
+
+        return int(re.search(r'desc="(\d+) queries"', response["Server-Timing"]).group(1))
+
+    def testBudgets(self):
+        for urlconf in ["todo.urls", "todoguardian.tests.async_urls"]:
+            with self.settings(ROOT_URLCONF=urlconf):
+                self.populate(5)
+                few = {name: self.queries(name, pattern) for name, pattern in budgeted_views(urlconf)}
+
+                self.populate(50)
+                many = {name: self.queries(name, pattern) for name, pattern in budgeted_views(urlconf)}
+
+                for name, pattern in budgeted_views(urlconf):
+                    with self.subTest(urlconf=urlconf, view=name):
+                        self.assertLessEqual(many[name], pattern.callback.query_budget)
+                        self.assertEqual(few[name], many[name])
+
+            Todo.objects.all().delete()
+
+    async def testFilteredAsyncDashboard(self):
+        todo = await Todo.afrom_string("Some todo +projecta @contexta due:today")
+
+        with self.settings(ROOT_URLCONF="todoguardian.tests.async_urls"):
+            response = await self.async_client.get(reverse("todoguardian:dashboard"), {"project": (await todo.projects.aget()).id, "context": (await todo.contexts.aget()).id})
+
+        # Each filter costs one query on top of the unfiltered dashboard, which stays within its budget of 8
+        self.assertIn('desc="7 queries"', response["Server-Timing"])
+
+    def testAdminChangelist(self):
+        self.client.force_login(User.objects.create_superuser("admin"))
+
+        self.populate(5)
+        response = self.client.get(reverse("admin:todoguardian_todo_changelist"))
+        few = int(re.search(r'desc="(\d+) queries"', response["Server-Timing"]).group(1))
+
+        self.populate(50)
+        response = self.client.get(reverse("admin:todoguardian_todo_changelist"))
+        many = int(re.search(r'desc="(\d+) queries"', response["Server-Timing"]).group(1))
+
+        self.assertEqual(few, many)
@@ -1,7 +1,13 @@
+from io import StringIO
+from unittest import mock
+
 from dateutil.relativedelta import relativedelta
+from django.core.management import call_command
 from django.test import TestCase
 from django.utils import timezone
 
+from ..functions.recurrence import complete_todos
+from ..functions.todotxt import import_todos
 from ..models import Todo, Project, Context
 
 
@@ -98,3 +104,161 @@ class TodoTestCase(TestCase):
         self.assertEqual(todo.contexts.all().count(), 3)
         self.assertEqual(Project.objects.all().count(), 3)
         self.assertEqual(Context.objects.all().count(), 3)
+
+    def testDueDateCodeAnnotation(self):
+        for todo in Todo.objects.with_due_date_code():
+            self.assertEqual(todo.due_date_code_value, todo.due_date_code)
+
+    def testDueDateCounts(self):
+        with self.assertNumQueries(1):
+            counts = Todo.objects.with_due_date_code().due_date_counts()
+
+        self.assertEqual(counts, {"past": 1, "today": 1, "soon": 1, "later": 1, "none": 4})
+
+    def testPercentCompleted(self):
+        self.bare_todo.projects.add(self.project_a)
+        self.todo_with_due.projects.add(self.project_a)
+        self.bare_todo.mark_complete()
+
+        self.project_a.refresh_from_db()
+        self.context_a.refresh_from_db()
+
+        self.assertEqual(self.project_a.percent_completed, 50)
+        self.assertEqual(self.context_a.percent_completed, 100)
+
+
+class CountersTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.project = Project.objects.create(name="project")
+        self.context = Context.objects.create(name="context")
+
+    def assertCounts(self, collection, open_count, completed_count):
+        collection.refresh_from_db()
+
+        self.assertEqual((collection.open_count, collection.completed_count), (open_count, completed_count))
+
+    def testSignals(self):
+        todo = Todo.from_string("Todo +project @context")
+        other = Todo.from_string("x 2024-06-01 Other todo +project")
+        self.assertCounts(self.project, 1, 1)
+        self.assertCounts(self.context, 1, 0)
+
+        todo.mark_complete()
+        self.assertCounts(self.project, 0, 2)
+
+        todo.mark_not_complete()
+        self.assertCounts(self.project, 1, 1)
+        self.assertCounts(self.context, 1, 0)
+
+        todo.update_from_string("Todo without context +project")
+        self.assertCounts(self.project, 1, 1)
+        self.assertCounts(self.context, 0, 0)
+
+        self.context.todos.add(todo, other)
+        self.assertCounts(self.context, 1, 1)
+
+        self.context.todos.clear()
+        self.assertCounts(self.context, 0, 0)
+
+        other.delete()
+        self.assertCounts(self.project, 1, 0)
+
+    def testRemovingUnlinked(self):
+        todo = Todo.from_string("Todo +project")
+        other = Todo.from_string("Other todo @context")
+
+        # Only links that existed are counted as removed
+        todo.contexts.remove(self.context)
+        self.project.todos.remove(todo, other)
+        self.context.todos.remove(todo, other)
+        self.assertCounts(self.project, 0, 0)
+        self.assertCounts(self.context, 0, 0)
+
+        todo.projects.remove(self.project)
+        self.assertCounts(self.project, 0, 0)
+
+    def testBulkPaths(self):
+        list(import_todos(["Imported {i} +project @context".format(i=i) for i in range(5)]))
+        self.assertCounts(self.project, 5, 0)
+
+        complete_todos(Todo.objects.filter(description__in=["Imported 0", "Imported 1"]))
+        self.assertCounts(self.project, 3, 2)
+
+    def testRecount(self):
+        Todo.from_string("Todo +project @context")
+        Project.objects.update(open_count=10, completed_count=10)
+
+        call_command("recount", stdout=StringIO())
+
+        self.assertCounts(self.project, 1, 0)
+        self.assertEqual(self.project.percent_completed, 0)
+
+
+class AnnotationSummaryTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.todo = Todo.objects.create(description="Annotated todo")
+
+    def testSummary(self):
+        self.todo.annotations.create(text="First annotation")
+        latest = self.todo.annotations.create(text="Second annotation " + "x" * 200)
+
+        self.assertEqual(self.todo.annotation_count, 2)
+
+        todo = Todo.objects.get(pk=self.todo.pk)
+        self.assertEqual(todo.annotation_count, 2)
+        self.assertEqual(todo.last_annotated, latest.created)
+        self.assertEqual(todo.annotation_preview, latest.text[:100])
+
+        latest.delete()
+        todo.refresh_from_db()
+        self.assertEqual(todo.annotation_count, 1)
+        self.assertEqual(todo.annotation_preview, "First annotation")
+
+    def testStaleInstanceDoesNotOverwriteSummary(self):
+        todo = Todo.objects.get(pk=self.todo.pk)
+        self.todo.annotations.create(text="Annotation")
+
+        todo.postpone("1d")
+        todo.refresh_from_db()
+
+        self.assertEqual(todo.annotation_count, 1)
+
+    def testSaveDeletedInstance(self):
+        Todo.objects.filter(pk=self.todo.pk).delete()
+
+        self.todo.description = "Saved again"
+        self.todo.save()
+
+        self.assertEqual(Todo.objects.get(pk=self.todo.pk).description, "Saved again")
+
+
+class TodoRowsTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        lines = ["(A) Overdue todo +project-b +project-a @home due:-2d rec:+1w", "Soon todo @work due:2d t:today", "Later todo due:10d", "x 2024-06-01 Done todo +project-a"]
+        self.todos = [Todo.from_string(line) for line in lines]
+
+    def testMatchesTodos(self):
+        rows = {row.id: row for row in Todo.objects.rows()}
+
+        for todo in self.todos:
+            with self.subTest(todo=todo.description):
+                row = rows[todo.id]
+
+                self.assertEqual(row.to_string(), todo.to_string())
+                self.assertEqual((row.is_completed, row.is_overdue, row.is_due_soon, row.has_strict_recurrence), (todo.is_completed, todo.is_overdue, todo.is_due_soon, todo.has_strict_recurrence))
+                self.assertEqual(row.due_date_code, todo.due_date_code)
+                self.assertEqual([project.name for project in row.projects], [project.name for project in todo.projects.all()])
+                self.assertEqual([context.id for context in row.contexts], [context.id for context in todo.contexts.all()])
+
+    def testQueries(self):
+        with self.assertNumQueries(3):
+            self.assertEqual(len(Todo.objects.rows()), 4)
+
+        with mock.patch("todoguardian.functions.rows.NAMES_BATCH_SIZE", 3), self.assertNumQueries(5):
+            self.assertEqual(len(list(Todo.objects.rows().iterator(chunk_size=2))), 4)
@@ -0,0 +1,353 @@
+import asyncio
+import json
+from inspect import iscoroutinefunction
+from unittest import mock
+
+from dateutil.relativedelta import relativedelta
+from django import shortcuts
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from freezegun import freeze_time
+
+from .. import views
+from ..functions.fragments import fragment_key
+from ..functions.pagination import PAGE_SIZE
+from ..functions.todotxt import import_todos
+from ..models import Project, Todo
+
+
+class DashboardTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.todo_overdue = Todo.from_string("Todo overdue +projecta @contexta due:yesterday")
+        self.todo_due_today = Todo.from_string("Todo due today +projecta due:today")
+        self.todo_no_due = Todo.from_string("Todo without due date @contexta")
+        self.todo_future = Todo.objects.create(description="Todo starting later", start_date=timezone.localdate() + relativedelta(days=2))
+        self.todo_completed = Todo.from_string("x 2024-06-01 Completed todo due:today")
+
+        self.project = self.todo_overdue.projects.get()
+        self.context = self.todo_overdue.contexts.get()
+
+    def testCounts(self):
+        response = self.client.get(reverse("todoguardian:dashboard"))
+
+        self.assertEqual(response.context["counts"], {"past": 1, "today": 1, "soon": 0, "later": 0, "none": 1})
+        self.assertEqual([todo.id for todo in response.context["todos"]], [self.todo_overdue.id, self.todo_due_today.id, self.todo_no_due.id])
+
+    def testFilter(self):
+        response = self.client.get(reverse("todoguardian:dashboard"), {"filter": "today"})
+
+        self.assertEqual([todo.id for todo in response.context["todos"]], [self.todo_due_today.id])
+
+    def testFilterWithProjectAndContext(self):
+        response = self.client.get(reverse("todoguardian:dashboard"), {"filter": "past", "project": self.project.id, "context": self.context.id})
+
+        self.assertEqual([todo.id for todo in response.context["todos"]], [self.todo_overdue.id])
+
+    def testAnnotationsAreNotLoaded(self):
+        self.todo_overdue.annotations.create(text="Some annotation")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("todoguardian:dashboard"))
+
+        self.assertContains(response, "1 annotation")
+        self.assertFalse([query for query in queries if '"todoguardian_annotation"."text"' in query["sql"]])
+
+        response = self.client.get(reverse("todoguardian:todo_annotations", args=[self.todo_overdue.id]))
+        self.assertContains(response, "Some annotation")
+
+    def testModalsAreLoadedOnDemand(self):
+        response = self.client.get(reverse("todoguardian:dashboard"))
+
+        self.assertNotContains(response, 'id="edit_todo_')
+        self.assertContains(response, reverse("todoguardian:todo_modals", args=[self.todo_overdue.id]))
+
+        response = self.client.get(reverse("todoguardian:todo_modals", args=[self.todo_overdue.id]))
+        self.assertContains(response, 'id="edit_todo_{id}"'.format(id=self.todo_overdue.id))
+        self.assertContains(response, self.todo_overdue.to_string())
+        self.assertContains(response, 'name="csrfmiddlewaretoken"', count=3)
+
+        self.assertEqual(self.client.get(reverse("todoguardian:todo_modals", args=[0])).status_code, 404)
+
+
+class StreamingTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        sum(import_todos(["Todo {i} +project-{project} due:{due}d".format(i=i, project=i % 3, due=i % 20) for i in range(PAGE_SIZE + 10)] + ["x 2024-06-01 Done todo"]))
+
+    def testShellFirst(self):
+        response = self.client.get(reverse("todoguardian:dashboard"), {"all": "1"})
+        chunks = iter(response.streaming_content)
+
+        # The page is rendered by the view, todos are only read once the stream reaches them
+        with self.assertNumQueries(0):
+            shell = next(chunks).decode()
+
+        self.assertIn("Dashboard", shell)
+        self.assertNotIn("Todo 0", shell)
+
+        # One query for the todos and one per collection type for their names, for each list
+        with self.assertNumQueries(6):
+            html = shell + b"".join(chunks).decode()
+
+        self.assertEqual(html.count('<tr class="hover">'), PAGE_SIZE + 10)
+        self.assertNotIn("Done todo", html)
+        self.assertNotIn("Show all", html)
+
+    def testCacheNotFilled(self):
+        cache.clear()
+        todo = Todo.objects.get(description="Todo 0")
+
+        b"".join(self.client.get(reverse("todoguardian:dashboard"), {"all": "1"}).streaming_content)
+        self.assertIsNone(cache.get(fragment_key("templatetags/show_todo.html", todo.id)))
+
+        # Fragments cached by the paginated dashboard are read, not replaced
+        self.client.get(reverse("todoguardian:dashboard"))
+        cached = cache.get(fragment_key("templatetags/show_todo.html", todo.id))
+
+        b"".join(self.client.get(reverse("todoguardian:dashboard"), {"all": "1"}).streaming_content)
+        self.assertEqual(cache.get(fragment_key("templatetags/show_todo.html", todo.id)), cached)
+        self.assertIsNotNone(cached)
+
+    def testArchive(self):
+        response = self.client.get(reverse("todoguardian:archive"), {"all": "1"})
+
+        self.assertIn("Done todo", b"".join(response.streaming_content).decode())
+
+    def testShowAllLink(self):
+        response = self.client.get(reverse("todoguardian:dashboard"), {"project": Project.objects.get(name="project 1").id})
+
+        self.assertEqual(response.context["page"].all_query, "project={id}&all=1".format(id=Project.objects.get(name="project 1").id))
+
+    @override_settings(ROOT_URLCONF="todoguardian.tests.async_urls")
+    async def testAsync(self):
+        response = await self.async_client.get(reverse("todoguardian:dashboard"), {"all": "1"})
+
+        html = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(html.count('<tr class="hover">'), PAGE_SIZE + 10)
+
+
+class ProjectsContextsTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        for i in range(10):
+            Todo.from_string("Open todo +project{i} @context{i}".format(i=i))
+            Todo.from_string("x 2024-06-01 Completed todo +project{i} @context{i}".format(i=i))
+
+    def testProjectsQueryCount(self):
+        # 1 query for the conditional GET validator, 1 for the page
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("todoguardian:projects"))
+
+        self.assertEqual([project.percent_completed for project in response.context["projects"]], [50] * 10)
+
+    def testContextsQueryCount(self):
+        # 1 query for the conditional GET validator, 1 for the page
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("todoguardian:contexts"))
+
+        self.assertEqual([context.percent_completed for context in response.context["contexts"]], [50] * 10)
+
+
+class CompleteTestCase(TestCase):
+    def testCompleteRecurring(self):
+        todo = Todo.from_string("Recurring todo due:today rec:1w +projecta")
+
+        self.client.post(reverse("todoguardian:complete_todo"), {"todo_id": todo.id})
+
+        self.assertTrue(Todo.objects.get(pk=todo.pk).is_completed)
+        self.assertEqual(Todo.objects.filter(completion_date=None, due_date=timezone.localdate() + relativedelta(days=7), projects__name="projecta").count(), 1)
+
+    def testUncomplete(self):
+        todo = Todo.from_string("x 2024-06-01 Completed todo rec:1w")
+
+        self.client.post(reverse("todoguardian:complete_todo"), {"todo_id": todo.id})
+
+        self.assertFalse(Todo.objects.get(pk=todo.pk).is_completed)
+        self.assertEqual(Todo.objects.count(), 1)
+
+
+class BatchTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.todo = Todo.from_string("Existing todo +projecta due:today")
+        self.recurring = Todo.from_string("Recurring todo due:today rec:1w")
+
+    def post(self, operations):
+        return self.client.post(reverse("todoguardian:batch"), json.dumps(operations), content_type="application/json")
+
+    def testOperations(self):
+        response = self.post(
+            [
+                "(A) New todo +projectb @home",
+                {"op": "update", "id": self.todo.id, "todo": "Changed todo +projectc"},
+                {"op": "complete", "id": self.recurring.id},
+                {"op": "postpone", "id": 12345, "pattern": "1d"},
+                {"op": "unknown"},
+            ]
+        )
+        results = response.json()["results"]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result["status"] for result in results], ["ok", "ok", "ok", "error", "error"])
+
+        new = Todo.objects.get(pk=results[0]["id"])
+        self.assertEqual(new.priority, "A")
+        self.assertEqual(list(new.projects.values_list("name", flat=True)), ["projectb"])
+
+        self.todo.refresh_from_db()
+        self.assertEqual(self.todo.description, "Changed todo")
+        self.assertEqual(list(self.todo.projects.values_list("name", flat=True)), ["projectc"])
+        self.assertEqual(results[1]["todo"], self.todo.to_string())
+
+        self.assertTrue(Todo.objects.get(pk=self.recurring.pk).is_completed)
+        self.assertNotIn("created", response.json())
+
+    def testChangingTodoTwice(self):
+        results = self.post([{"op": "postpone", "id": self.todo.id, "pattern": "1d"}, {"op": "complete", "id": self.todo.id}]).json()["results"]
+
+        self.assertEqual([result["status"] for result in results], ["ok", "error"])
+
+        self.todo.refresh_from_db()
+        self.assertEqual(self.todo.due_date, timezone.localdate() + relativedelta(days=1))
+        self.assertFalse(self.todo.is_completed)
+
+    def testQueryCountIndependentOfBatchSize(self):
+        todos = [Todo.from_string("Todo {i} +project{i}".format(i=i)) for i in range(20)]
+
+        # Savepoint and release, todo lookup, 5 for the creates, 1 update, 3 to uncount the old links, 2 link deletes,
+        # 4 for the new links and 3 to report the results
+        with self.assertNumQueries(21):
+            self.post(["Created {i} +new{i}".format(i=i) for i in range(20)] + [{"op": "update", "id": todo.id, "todo": "Updated {id} @context".format(id=todo.id)} for todo in todos])
+
+    def testInvalidRequests(self):
+        self.assertEqual(self.client.post(reverse("todoguardian:batch"), {"todo": "x"}).status_code, 415)
+        self.assertEqual(self.client.post(reverse("todoguardian:batch"), "{", content_type="application/json").status_code, 400)
+        self.assertEqual(self.post({"operations": "x"}).status_code, 400)
+
+
+class ConditionalTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.todo = Todo.from_string("Todo due today +projecta due:today")
+
+    def get(self, name, **headers):
+        return self.client.get(reverse(name), headers=headers)
+
+    def testNotModified(self):
+        for name in ["todoguardian:dashboard", "todoguardian:archive", "todoguardian:projects", "todoguardian:contexts"]:
+            etag = self.get(name)["ETag"]
+
+            # Only the validator query, the view itself does not run
+            with self.assertNumQueries(1):
+                response = self.get(name, if_none_match=etag)
+
+            self.assertEqual(response.status_code, 304)
+
+    def testChangesInvalidate(self):
+        response = self.get("todoguardian:dashboard")
+
+        self.todo.annotations.create(text="New annotation")
+
+        self.assertEqual(self.get("todoguardian:dashboard", if_none_match=response["ETag"]).status_code, 200)
+
+        response = self.get("todoguardian:dashboard")
+        Todo.objects.filter(pk=self.todo.pk).delete()
+
+        self.assertEqual(self.get("todoguardian:dashboard", if_none_match=response["ETag"]).status_code, 200)
+
+    def testCollectionChangesInvalidate(self):
+        project = Project.objects.get(name="projecta")
+        changes = {
+            "rename": lambda: Project.objects.get(pk=project.pk).save(),
+            "link": lambda: self.todo.contexts.create(name="context"),
+            "unlink": lambda: project.todos.remove(self.todo),
+        }
+
+        for name, change in changes.items():
+            with self.subTest(name):
+                response = self.get("todoguardian:dashboard")
+                change()
+
+                self.assertEqual(self.get("todoguardian:dashboard", if_none_match=response["ETag"]).status_code, 200)
+
+    def testDateChangeInvalidates(self):
+        response = self.get("todoguardian:dashboard")
+
+        with freeze_time(timezone.localdate() + relativedelta(days=1)):
+            self.assertEqual(self.get("todoguardian:dashboard", if_none_match=response["ETag"], if_modified_since=response["Last-Modified"]).status_code, 200)
+
+    def testPendingMessages(self):
+        self.client.post(reverse("todoguardian:add_todo"), {"todo_string": "Another todo"})
+
+        response = self.get("todoguardian:dashboard")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("ETag"))
+
+
+@override_settings(ROOT_URLCONF="todoguardian.tests.async_urls")
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.todo = Todo.from_string("Todo due today +projecta due:today")
+        self.todo_completed = Todo.from_string("x 2024-06-01 Completed todo")
+
+    def testRouting(self):
+        self.assertTrue(iscoroutinefunction(resolve(reverse("todoguardian:dashboard"), "todoguardian.tests.async_urls").func))
+
+    async def testRendersOutsideEventLoop(self):
+        loops = []
+
+        def render(*args, **kwargs):
+            loops.append(asyncio._get_running_loop())
+            return shortcuts.render(*args, **kwargs)
+
+        with mock.patch.object(views, "render", render):
+            response = await self.async_client.get(reverse("todoguardian:archive"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(loops, [None])
+
+    async def testDashboard(self):
+        response = await self.async_client.get(reverse("todoguardian:dashboard"), {"project": self.todo.id})
+
+        self.assertEqual(response.context["counts"], {"past": 0, "today": 1, "soon": 0, "later": 0, "none": 0})
+        self.assertEqual([todo.id for todo in response.context["todos"]], [self.todo.id])
+        self.assertContains(response, "+projecta")
+
+        response = await self.async_client.get(reverse("todoguardian:dashboard"), {"project": self.todo.id}, headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+    async def testArchive(self):
+        response = await self.async_client.get(reverse("todoguardian:archive"))
+
+        self.assertEqual([todo.id for todo in response.context["todos"]], [self.todo_completed.id])
+
+    async def testActions(self):
+        await self.async_client.post(reverse("todoguardian:add_todo"), {"todo_string": "New todo @home"})
+        new = await Todo.objects.aget(description="New todo")
+
+        await self.async_client.post(reverse("todoguardian:edit_todo", args=[new.id]), {"todo_string": "Changed todo @work due:today"})
+        await self.async_client.post(reverse("todoguardian:postpone_todo", args=[new.id]), {"pattern": "2d"})
+        await self.async_client.post(reverse("todoguardian:annotate_todo", args=[new.id]), {"annotation": "Some annotation"})
+        response = await self.async_client.post(reverse("todoguardian:complete_todo"), {"todo_id": new.id})
+
+        self.assertRedirects(response, reverse("todoguardian:dashboard"), fetch_redirect_response=False)
+
+        await new.arefresh_from_db()
+        self.assertEqual(new.description, "Changed todo")
+        self.assertEqual(new.due_date, timezone.localdate() + relativedelta(days=2))
+        self.assertEqual(new.annotation_preview, "Some annotation")
+        self.assertTrue(new.is_completed)
+        self.assertEqual([context.name async for context in new.contexts.all()], ["work"])
@@ -1,17 +1,37 @@
-from django.urls import path
+from typing import Callable
+
+from django.conf import settings
+from django.urls import URLPattern, path
 
 from . import views
 
 app_name = "todoguardian"
-urlpatterns = [
-    path("", views.dashboard, name="index"),
-    path("add/", views.add, name="add_todo"),
-    path("edit/<int:id>/", views.edit, name="edit_todo"),
-    path("postpone/<int:id>/", views.postpone, name="postpone_todo"),
-    path("annotate/<int:id>/", views.annotate, name="annotate_todo"),
-    path("complete/", views.complete, name="complete_todo"),
-    path("dashboard/", views.dashboard, name="dashboard"),
-    path("archive/", views.archive, name="archive"),
-    path("projects/", views.projects, name="projects"),
-    path("contexts/", views.contexts, name="contexts"),
-]
+
+
+def get_urlpatterns(asynchronous: bool = False) -> list[URLPattern]:
+    """Returns the URL patterns of the app, routing to the async versions of the views in `views.ASYNC_VIEWS` if `asynchronous` is set."""
+
+    def view(sync_view: Callable) -> Callable:
+        return views.ASYNC_VIEWS.get(sync_view, sync_view) if asynchronous else sync_view
+
+    return [
+        path("", view(views.dashboard), name="index"),
+        path("add/", view(views.add), name="add_todo"),
+        path("upload/", views.upload, name="upload_todos"),
+        path("export/", views.export, name="export_todos"),
+        path("api/batch/", views.batch, name="batch"),
+        path("edit/<int:id>/", view(views.edit), name="edit_todo"),
+        path("postpone/<int:id>/", view(views.postpone), name="postpone_todo"),
+        path("annotate/<int:id>/", view(views.annotate), name="annotate_todo"),
+        path("modals/<int:id>/", views.modals, name="todo_modals"),
+        path("annotations/<int:id>/", views.annotations, name="todo_annotations"),
+        path("complete/", view(views.complete), name="complete_todo"),
+        path("dashboard/", view(views.dashboard), name="dashboard"),
+        path("archive/", view(views.archive), name="archive"),
+        path("search/", views.search, name="search"),
+        path("projects/", views.projects, name="projects"),
+        path("contexts/", views.contexts, name="contexts"),
+    ]
+
+
+urlpatterns = get_urlpatterns(settings.TODOGUARDIAN_ASYNC_VIEWS)
@@ -1,52 +1,79 @@
+import codecs
+import json
+
+from asgiref.sync import sync_to_async
 from django.contrib import messages
-from django.db.models import F, Value
-from django.db.models.fields import DateField
-from django.db.models.functions import Coalesce
-from django.http import HttpRequest, HttpResponse
-from django.shortcuts import redirect, render
+from django.db.models import QuerySet
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .functions.batch import MAX_OPERATIONS, apply_operations
+from .functions.conditional import conditional_todos
+from .functions.fragments import render_todo_fragment
+from .functions.pagination import ORDERING, InvalidCursorException, KeysetPage, apaginate, paginate
+from .functions.recurrence import acomplete_todos, complete_todos
+from .functions.search import search as search_todos
+from .functions.streaming import astream, stream_todos
+from .functions.timing import query_budget
+from .functions.todotxt import EXPORT_STATUSES, export_queryset, export_todos, import_todos
+from .models import DUE_DATE_FILTERS, Annotation, Todo, Project, Context
+
+
+def _paginate(request: HttpRequest, todos: QuerySet[Todo]) -> KeysetPage:
+    """Returns the page of todos selected by the `after`/`before` cursors in the query string, with the query strings to reach the neighbouring pages."""
+    try:
+        page = paginate(todos, after=request.GET.get("after"), before=request.GET.get("before"))
+    except InvalidCursorException:
+        page = paginate(todos)
+
+    return _link_pages(request, page)
+
+
+async def _apaginate(request: HttpRequest, todos: QuerySet[Todo]) -> KeysetPage:
+    try:
+        page = await apaginate(todos, after=request.GET.get("after"), before=request.GET.get("before"))
+    except InvalidCursorException:
+        page = await apaginate(todos)
+
+    return _link_pages(request, page)
+
+
+def _link_pages(request: HttpRequest, page: KeysetPage) -> KeysetPage:
+    query = request.GET.copy()
+    query.pop("after", None)
+    query.pop("before", None)
+
+    if page.next_cursor is not None:
+        page.next_query = "{query}&after={cursor}".format(query=query.urlencode(), cursor=page.next_cursor).lstrip("&")
+
+    if page.previous_cursor is not None:
+        page.previous_query = "{query}&before={cursor}".format(query=query.urlencode(), cursor=page.previous_cursor).lstrip("&")
+
+    query["all"] = "1"
+    page.all_query = query.urlencode()
+
+    return page
 
-from .functions.recurrence import NoRecurrenceException, advance_todo
-from .models import Todo, Project, Context
 
+def _stream(request: HttpRequest, template_name: str, context: dict, todos: QuerySet[Todo]) -> StreamingHttpResponse:
+    """Renders all todos on a single page as a stream (see `stream_todos`), in the order of the paginated pages."""
+    return StreamingHttpResponse(stream_todos(request, template_name, context, todos.order_by(*ORDERING)))
 
+
+# 5 queries, plus one per project or context filter
+@query_budget(8)
+@conditional_todos()
 def dashboard(request: HttpRequest) -> HttpResponse:
-    todos = (
-        Todo.objects.filter(completion_date=None)
-        .exclude(start_date__gt=timezone.localdate())
-        .annotate(due_date_value=Coalesce("due_date", Value("9999-12-31"), output_field=DateField()), start_date_value=Coalesce("start_date", Value("9999-12-31"), output_field=DateField()))
-        .order_by("due_date_value", "start_date_value", "priority")
-        .prefetch_related("projects", "contexts", "annotations")
-    )
-
-    counts = {"past": 0, "today": 0, "soon": 0, "later": 0, "none": 0}
-    for todo in todos:
-        match todo.due_date_code:
-            case -1:
-                counts["past"] += 1
-            case 0:
-                counts["today"] += 1
-            case 1:
-                counts["soon"] += 1
-            case 2:
-                counts["later"] += 1
-            case _:
-                counts["none"] += 1
-
-    if request.GET.get("filter"):
-        match request.GET.get("filter"):
-            case "past":
-                todos = [todo for todo in todos if todo.due_date_code == -1]
-            case "today":
-                todos = [todo for todo in todos if todo.due_date_code == 0]
-            case "soon":
-                todos = [todo for todo in todos if todo.due_date_code == 1]
-            case "later":
-                todos = [todo for todo in todos if todo.due_date_code == 2]
-            case "none":
-                todos = [todo for todo in todos if todo.due_date_code == 3]
-            case _:
-                pass
+    todos = Todo.objects.filter(completion_date=None).exclude(start_date__gt=timezone.localdate()).with_due_date_code()
+
+    counts = todos.due_date_counts()
+
+    if request.GET.get("filter") in DUE_DATE_FILTERS:
+        todos = todos.filter(due_date_code_value=DUE_DATE_FILTERS[request.GET.get("filter")])
 
     project = None
     if request.GET.get("project"):
@@ -58,7 +85,13 @@ def dashboard(request: HttpRequest) -> HttpResponse:
         context = Context.objects.get(pk=request.GET.get("context"))
         todos = todos.filter(contexts=context)
 
-    return render(request, "dashboard.html", {"todos": todos, "counts": counts, "filter": request.GET.get("filter"), "project": project, "context": context})
+    filters = {"counts": counts, "filter": request.GET.get("filter"), "project": project, "context": context}
+    if request.GET.get("all"):
+        return _stream(request, "dashboard.html", filters, todos)
+
+    page = _paginate(request, todos.rows())
+
+    return render(request, "dashboard.html", {"todos": page.todos, "page": page, **filters})
 
 
 def add(request: HttpRequest) -> HttpResponse:
@@ -69,6 +102,55 @@ def add(request: HttpRequest) -> HttpResponse:
     return redirect("todoguardian:dashboard")
 
 
+def upload(request: HttpRequest) -> HttpResponse:
+    if request.method == "POST" and request.FILES.get("todo_file"):
+        total = sum(import_todos(codecs.iterdecode(request.FILES["todo_file"], "utf-8")))
+        messages.success(request, "Imported <span class='font-semibold'>{total}</span> todos".format(total=total))
+
+    return redirect("todoguardian:dashboard")
+
+
+def export(request: HttpRequest) -> StreamingHttpResponse:
+    status = request.GET.get("status", "all")
+    if status not in EXPORT_STATUSES:
+        status = "all"
+
+    response = StreamingHttpResponse(export_todos(export_queryset(status)), content_type="text/plain; charset=utf-8")
+    response["Content-Disposition"] = 'attachment; filename="{filename}"'.format(filename="done.txt" if status == "completed" else "todo.txt")
+
+    return response
+
+
+@csrf_exempt
+@require_POST
+def batch(request: HttpRequest) -> JsonResponse:
+    """
+    Applies a batch of operations in one transaction, see `apply_operations`. The body is a JSON list of operations
+    (or of todo.txt strings to create), or an object holding that list under `operations`.
+
+    Only `application/json` bodies are accepted, which browsers cannot send cross-site without a preflight request,
+    so the endpoint can do without a CSRF token.
+    """
+    if request.content_type != "application/json":
+        return JsonResponse({"error": "expected an application/json body"}, status=415)
+
+    try:
+        operations = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "invalid JSON"}, status=400)
+
+    if isinstance(operations, dict):
+        operations = operations.get("operations")
+
+    if not isinstance(operations, list):
+        return JsonResponse({"error": "expected a list of operations"}, status=400)
+
+    if len(operations) > MAX_OPERATIONS:
+        return JsonResponse({"error": "at most {max} operations per batch".format(max=MAX_OPERATIONS)}, status=400)
+
+    return JsonResponse(apply_operations(operations))
+
+
 def edit(request: HttpRequest, id: int) -> HttpResponse:
     if request.method == "POST":
         todo = Todo.objects.get(id=id)
@@ -96,6 +178,19 @@ def annotate(request: HttpRequest, id: int) -> HttpResponse:
     return redirect("todoguardian:dashboard")
 
 
+@query_budget(3)
+def modals(request: HttpRequest, id: int) -> HttpResponse:
+    """Returns the edit, postpone and annotate modals of a todo, which the list views load once one of them is opened."""
+    todo = get_object_or_404(Todo.objects.rows(), pk=id)
+
+    return HttpResponse(render_todo_fragment("templatetags/show_todo_modals.html", todo, get_token(request)))
+
+
+@query_budget(1)
+def annotations(request: HttpRequest, id: int) -> HttpResponse:
+    return render(request, "templatetags/show_annotations.html", {"annotations": Annotation.objects.filter(todo_id=id)})
+
+
 def complete(request: HttpRequest) -> HttpResponse:
     if request.method == "POST":
         todo = Todo.objects.get(id=request.POST.get("todo_id"))
@@ -105,37 +200,162 @@ def complete(request: HttpRequest) -> HttpResponse:
             messages.success(request, "Todo <span class='font-semibold'>{description}</span> marked as not completed".format(description=todo.description))
 
         else:
-            todo.mark_complete()
+            complete_todos(Todo.objects.filter(pk=todo.pk))
+            messages.success(request, "Todo <span class='font-semibold'>{description}</span> marked as completed".format(description=todo.description))
 
-            try:
-                advance_todo(todo)
-                messages.success(request, "Todo <span class='font-semibold'>{description}</span> marked as completed".format(description=todo.description))
-                messages.success(request, "New todo <span class='font-semibold'>{description}</span> created".format(description=todo.description))
+    return redirect("todoguardian:dashboard")
 
-            except NoRecurrenceException:
-                messages.success(request, "Todo <span class='font-semibold'>{description}</span> marked as completed".format(description=todo.description))
 
-    return redirect("todoguardian:dashboard")
+@query_budget(4)
+def search(request: HttpRequest) -> HttpResponse:
+    query = request.GET.get("q", "").strip()
+
+    return render(request, "search.html", {"query": query, "results": search_todos(query)})
 
 
+@query_budget(2)
+@conditional_todos(Project)
 def projects(request: HttpRequest) -> HttpResponse:
-    projects = Project.objects.all().order_by("name")
+    projects = Project.objects.order_by("name")
 
     return render(request, "projects.html", {"projects": projects})
 
 
+@query_budget(2)
+@conditional_todos(Context)
 def contexts(request: HttpRequest) -> HttpResponse:
-    contexts = Context.objects.all().order_by("name")
+    contexts = Context.objects.order_by("name")
 
     return render(request, "contexts.html", {"contexts": contexts})
 
 
+@query_budget(4)
+@conditional_todos()
 def archive(request: HttpRequest) -> HttpResponse:
-    todos = (
-        Todo.objects.exclude(completion_date=None)
-        .annotate(due_date_value=Coalesce("due_date", Value("9999-12-31"), output_field=DateField()), start_date_value=Coalesce("start_date", Value("9999-12-31"), output_field=DateField()))
-        .order_by("due_date_value", "start_date_value", "priority")
-        .prefetch_related("projects", "contexts", "annotations")
-    )
-
-    return render(request, "dashboard.html", {"todos": todos})
+    todos = Todo.objects.filter(completion_date__isnull=False)
+    if request.GET.get("all"):
+        return _stream(request, "dashboard.html", {}, todos)
+
+    page = _paginate(request, todos.rows())
+
+    return render(request, "dashboard.html", {"todos": page.todos, "page": page})
+
+
+# Async versions of the list and todo views, routed instead of the views above when `TODOGUARDIAN_ASYNC_VIEWS` is
+# set (the default for the ASGI entry point). Queries run through the async ORM, so a request waiting on the
+# database does not hold a worker thread.
+
+
+async def _arender(request: HttpRequest, template_name: str, context: dict) -> HttpResponse:
+    """Renders a template from an async view in a worker thread, as templates (and the context processors, e.g. `request.user`) run synchronously."""
+    return await sync_to_async(render)(request, template_name, context)
+
+
+async def _astream(request: HttpRequest, template_name: str, context: dict, todos: QuerySet[Todo]) -> StreamingHttpResponse:
+    chunks = await sync_to_async(stream_todos)(request, template_name, context, todos.order_by(*ORDERING))
+
+    return StreamingHttpResponse(astream(chunks))
+
+
+# 5 queries, plus one per project or context filter
+@query_budget(8)
+@conditional_todos()
+async def adashboard(request: HttpRequest) -> HttpResponse:
+    todos = Todo.objects.filter(completion_date=None).exclude(start_date__gt=timezone.localdate()).with_due_date_code()
+
+    counts = await todos.adue_date_counts()
+
+    if request.GET.get("filter") in DUE_DATE_FILTERS:
+        todos = todos.filter(due_date_code_value=DUE_DATE_FILTERS[request.GET.get("filter")])
+
+    project = None
+    if request.GET.get("project"):
+        project = await Project.objects.aget(pk=request.GET.get("project"))
+        todos = todos.filter(projects=project)
+
+    context = None
+    if request.GET.get("context"):
+        context = await Context.objects.aget(pk=request.GET.get("context"))
+        todos = todos.filter(contexts=context)
+
+    filters = {"counts": counts, "filter": request.GET.get("filter"), "project": project, "context": context}
+    if request.GET.get("all"):
+        return await _astream(request, "dashboard.html", filters, todos)
+
+    page = await _apaginate(request, todos.rows())
+
+    return await _arender(request, "dashboard.html", {"todos": page.todos, "page": page, **filters})
+
+
+@query_budget(4)
+@conditional_todos()
+async def aarchive(request: HttpRequest) -> HttpResponse:
+    todos = Todo.objects.filter(completion_date__isnull=False)
+    if request.GET.get("all"):
+        return await _astream(request, "dashboard.html", {}, todos)
+
+    page = await _apaginate(request, todos.rows())
+
+    return await _arender(request, "dashboard.html", {"todos": page.todos, "page": page})
+
+
+async def aadd(request: HttpRequest) -> HttpResponse:
+    if request.method == "POST":
+        todo = await Todo.afrom_string(request.POST.get("todo_string"))
+        messages.success(request, "New todo <span class='font-semibold'>{description}</span> created".format(description=todo.description))
+
+    return redirect("todoguardian:dashboard")
+
+
+async def aedit(request: HttpRequest, id: int) -> HttpResponse:
+    if request.method == "POST":
+        todo = await Todo.objects.aget(id=id)
+        await todo.aupdate_from_string(request.POST.get("todo_string"))
+        messages.success(request, "Todo <span class='font-semibold'>{description}</span> changed".format(description=todo.description))
+
+    return redirect("todoguardian:dashboard")
+
+
+async def apostpone(request: HttpRequest, id: int) -> HttpResponse:
+    if request.method == "POST":
+        todo = await Todo.objects.aget(id=id)
+        await todo.apostpone(request.POST.get("pattern"))
+        messages.success(request, "Todo <span class='font-semibold'>{description}</span> postponed to new due date: {due_date}".format(description=todo.description, due_date=todo.due_date.strftime("%a %d.%m.%y")))
+
+    return redirect("todoguardian:dashboard")
+
+
+async def aannotate(request: HttpRequest, id: int) -> HttpResponse:
+    if request.method == "POST":
+        todo = await Todo.objects.aget(id=id)
+        await todo.annotations.acreate(text=request.POST.get("annotation"))
+        messages.success(request, "Annotation added to <span class='font-semibold'>{description}</span>".format(description=todo.description))
+
+    return redirect("todoguardian:dashboard")
+
+
+async def acomplete(request: HttpRequest) -> HttpResponse:
+    if request.method == "POST":
+        todo = await Todo.objects.aget(id=request.POST.get("todo_id"))
+
+        if todo.is_completed:
+            await todo.amark_not_complete()
+            messages.success(request, "Todo <span class='font-semibold'>{description}</span> marked as not completed".format(description=todo.description))
+
+        else:
+            await acomplete_todos(Todo.objects.filter(pk=todo.pk))
+            messages.success(request, "Todo <span class='font-semibold'>{description}</span> marked as completed".format(description=todo.description))
+
+    return redirect("todoguardian:dashboard")
+
+
+# Views replaced by their async version when routing asynchronously
+ASYNC_VIEWS = {
+    dashboard: adashboard,
+    archive: aarchive,
+    add: aadd,
+    edit: aedit,
+    postpone: apostpone,
+    annotate: aannotate,
+    complete: acomplete,
+}